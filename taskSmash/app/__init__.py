@@ -2,19 +2,70 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from config import Config
 from flask_login import LoginManager
+from app.group_commit import GroupCommitter
+from app.social_graph import FollowGraph
+from app.profiler import RequestProfiler
+from app.memory import MemoryTracker
+from app.metrics import Metrics
+from app.fragment_cache import FragmentCache
+from app.assets import AssetPipeline
+from app.admission import AdmissionControl
 
 
 app = Flask(__name__)
 app.config.from_object(Config)
 db = SQLAlchemy(app)
 
+# Optional group commit for high-frequency inserts (see GROUP_COMMIT_* in config.py)
+group_committer = GroupCommitter(app, db)
+
+# Sampling profiler for slow requests (see PROFILER_* in config.py)
+profiler = RequestProfiler(app)
+
+# Per-endpoint memory growth from tracemalloc snapshots (see MEMORY_* in config.py)
+memory_tracker = MemoryTracker(app, db)
+
+# Per-endpoint request metrics served on /metrics (see METRICS_* in config.py)
+metrics = Metrics(app)
+
+# Per-route concurrency limits and load shedding (see ADMISSION_* in config.py)
+admission = AdmissionControl(app)
+
+# Rendered comment threads for the dashboard's expand-on-click fragments
+thread_cache = FragmentCache(app.config["THREAD_CACHE_MAX_ENTRIES"], app.config["THREAD_CACHE_TTL"])
+
+# Fingerprinted, precompressed static files on /assets/ (built by `flask build-assets`)
+assets = AssetPipeline(app)
+
+# In-memory follow graph, loaded from the Follow table at startup (run.py) or on first use
+follow_graph = FollowGraph()
+
 # Initialize the LoginManager and attach it to the app
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'  # where to redirect for login if not authenticated
 
+# Bloom filters for the register form's live availability check
+from app.availability import AvailabilityIndex
+availability_index = AvailabilityIndex(app.config["AVAILABILITY_BLOOM_CAPACITY"],
+                                       app.config["AVAILABILITY_BLOOM_ERROR_RATE"])
+
+# Cross-worker cache invalidation (see INVALIDATION_* in config.py)
+from app.invalidation import InvalidationBus, TASK, FOLLOW, USER
+invalidation_bus = InvalidationBus(app)
+invalidation_bus.subscribe(TASK, lambda task_id, _: thread_cache.delete(task_id))
+invalidation_bus.subscribe(FOLLOW, follow_graph.refresh_edge)
+invalidation_bus.subscribe(USER, lambda user_id, _: availability_index.refresh_user(user_id))
+invalidation_bus.on_reset(thread_cache.clear)
+invalidation_bus.on_reset(follow_graph.reset)
+invalidation_bus.on_reset(availability_index.reset)
+
+# Background sweeper for soft-deleted tasks (see TASK_SOFT_DELETE in config.py)
+from app.task_delete import TaskSweeper
+task_sweeper = TaskSweeper(app)
+
 # Import models so that they are registered with SQLAlchemy
-from app import routes, models
+from app import routes, models, commands
 
 @login_manager.user_loader
 def load_user(user_id):
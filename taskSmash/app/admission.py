@@ -0,0 +1,124 @@
+import math
+import threading
+import time
+from flask import request, g, Response
+
+# Routes that get a concurrency limit.  Everything else (/, /about, static
+# files, cheap writes) is never queued, so it stays fast during a spike.
+HASH_ENDPOINTS = {"login", "register", "reset_password"}  # only POSTs hash passwords
+DASHBOARD_ENDPOINTS = {"dashboard", "view_task", "task_thread"}
+
+
+class RouteLimiter:
+    """Concurrency limit with a bounded wait queue and a latency-driven ceiling.
+
+    At most `limit` requests run at once and at most `max_queue` wait for a
+    slot, each for no longer than max_wait seconds.  The limit moves between
+    1 and max_limit: it shrinks by 10% whenever a request takes longer than
+    target seconds and grows by about one slot per `limit` fast requests.
+    """
+
+    def __init__(self, name, max_limit, max_queue, max_wait, target):
+        self.name = name
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.target = target
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self.latency = target / 2  # moving average, seconds
+        self.rejected = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Take a slot; False if the queue is full or the wait ran past the deadline."""
+        with self._cond:
+            if self.in_flight < int(self.limit) and not self.waiting:
+                self.in_flight += 1
+                return True
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                return False
+            deadline = time.monotonic() + self.max_wait
+            self.waiting += 1
+            try:
+                while self.in_flight >= int(self.limit):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        return False
+                    self._cond.wait(remaining)
+                self.in_flight += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self, seconds):
+        with self._cond:
+            self.in_flight -= 1
+            self.latency += 0.1 * (seconds - self.latency)
+            if seconds > self.target:
+                self.limit = max(1.0, self.limit * 0.9)
+            else:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            self._cond.notify()
+
+    def retry_after(self):
+        """Seconds until the current backlog should have drained, rounded up."""
+        backlog = self.waiting + self.in_flight
+        return max(1, math.ceil(backlog * self.latency / max(1, int(self.limit))))
+
+
+class AdmissionControl:
+    """Per-route admission control: queue briefly, otherwise answer 503 fast.
+
+    Password-hashing POSTs and dashboard pages each get their own
+    RouteLimiter.  A request that cannot get a slot is turned away before
+    any work is done, with Retry-After saying when to come back.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self.limiters = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        if not app.config.get("ADMISSION_ENABLED"):
+            return
+        factor = app.config["ADMISSION_QUEUE_FACTOR"]
+        max_wait = app.config["ADMISSION_MAX_WAIT_MS"] / 1000
+        for name, limit, target in (
+            ("hash", app.config["ADMISSION_HASH_LIMIT"], app.config["ADMISSION_HASH_TARGET_MS"]),
+            ("dashboard", app.config["ADMISSION_DASHBOARD_LIMIT"], app.config["ADMISSION_DASHBOARD_TARGET_MS"]),
+        ):
+            self.limiters[name] = RouteLimiter(name, limit, limit * factor, max_wait, target / 1000)
+        app.before_request(self._before)
+        app.teardown_request(self._teardown)
+
+    def limiter_for(self, endpoint, method):
+        if endpoint in HASH_ENDPOINTS and method == "POST":
+            return self.limiters["hash"]
+        if endpoint in DASHBOARD_ENDPOINTS:
+            return self.limiters["dashboard"]
+        return None
+
+    def _before(self):
+        limiter = self.limiter_for(request.endpoint, request.method)
+        if limiter is None:
+            return None
+        if not limiter.acquire():
+            return Response("Server busy, please retry shortly.\n", status=503, mimetype="text/plain",
+                            headers={"Retry-After": str(limiter.retry_after())})
+        g._admission = (limiter, time.perf_counter())
+        return None
+
+    def _teardown(self, exc):
+        # Teardown runs after a streamed dashboard finishes rendering, so the
+        # slot is held for the whole response
+        admitted = g.pop("_admission", None)
+        if admitted is not None:
+            limiter, start = admitted
+            limiter.release(time.perf_counter() - start)
@@ -0,0 +1,156 @@
+import gzip
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import re
+from flask import request, url_for, send_from_directory, abort
+from werkzeug.utils import safe_join
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip variants are written
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:  # optional: needed only for --optimize-images
+    Image = None
+
+COMPRESSIBLE = {".css", ".js", ".svg", ".html", ".txt", ".json"}
+MANIFEST = "manifest.json"
+URL_PREFIX = "/assets/"
+# Matches url(...) references to /static/ files inside CSS
+CSS_STATIC_URL = re.compile(r"""url\((['"]?)/static/([^'")]+)\1\)""")
+
+
+def fingerprint(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def optimize_image(name, data):
+    """Re-encode PNG/JPEG with Pillow and keep the result only if it is smaller."""
+    ext = os.path.splitext(name)[1].lower()
+    if Image is None or ext not in (".png", ".jpg", ".jpeg"):
+        return data
+    out = io.BytesIO()
+    with Image.open(io.BytesIO(data)) as image:
+        if ext == ".png":
+            image.save(out, format="PNG", optimize=True)
+        else:
+            image.save(out, format="JPEG", optimize=True, quality=85, progressive=True)
+    return out.getvalue() if out.tell() < len(data) else data
+
+
+def build_assets(static_dir, out_dir, optimize_images=False):
+    """Write content-hashed copies of every static file plus .gz/.br variants.
+
+    Images are processed before CSS so /static/ references inside
+    stylesheets can be rewritten to the fingerprinted names.  Returns the
+    manifest mapping original names to fingerprinted ones.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    out_dir_abs = os.path.abspath(out_dir)
+    sources = []
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) != out_dir_abs]
+        for name in files:
+            path = os.path.join(root, name)
+            sources.append(os.path.relpath(path, static_dir).replace(os.sep, "/"))
+    # CSS last, so everything it points at already has a fingerprint
+    sources.sort(key=lambda name: (name.endswith(".css"), name))
+
+    manifest = {}
+    for name in sources:
+        with open(os.path.join(static_dir, name), "rb") as f:
+            data = f.read()
+        ext = os.path.splitext(name)[1].lower()
+        if optimize_images:
+            data = optimize_image(name, data)
+        if ext == ".css":
+            text = data.decode("utf-8")
+            text = CSS_STATIC_URL.sub(
+                lambda m: f"url({m.group(1)}{URL_PREFIX}{manifest.get(m.group(2), m.group(2))}{m.group(1)})",
+                text)
+            data = text.encode("utf-8")
+
+        base, _ = os.path.splitext(name)
+        hashed = f"{base}.{fingerprint(data)}{ext}"
+        target = os.path.join(out_dir, hashed)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(data)
+        if ext in COMPRESSIBLE:
+            with open(target + ".gz", "wb") as f:
+                f.write(gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli is not None:
+                with open(target + ".br", "wb") as f:
+                    f.write(brotli.compress(data, quality=11))
+        manifest[name] = hashed
+
+    with open(os.path.join(out_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+class AssetPipeline:
+    """Serve built assets from ASSETS_DIR with year-long immutable caching.
+
+    asset_url('styles.css') in templates returns the fingerprinted URL
+    when `flask build-assets` has been run, and the plain /static/ URL
+    otherwise, so development works without a build.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self._manifest = None
+        self._manifest_mtime = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.add_url_rule(URL_PREFIX + "<path:filename>", "asset", self.serve)
+        app.add_template_global(self.url, "asset_url")
+
+    @property
+    def out_dir(self):
+        return self.app.config.get("ASSETS_DIR") or os.path.join(self.app.static_folder, "dist")
+
+    def manifest(self):
+        path = os.path.join(self.out_dir, MANIFEST)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return {}
+        if mtime != self._manifest_mtime:
+            with open(path) as f:
+                self._manifest = json.load(f)
+            self._manifest_mtime = mtime
+        return self._manifest
+
+    def url(self, filename):
+        hashed = self.manifest().get(filename)
+        if hashed is None:
+            return url_for("static", filename=filename)
+        return url_for("asset", filename=hashed)
+
+    def serve(self, filename):
+        path = safe_join(self.out_dir, filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        encoding, variant = None, filename
+        for candidate, suffix in (("br", ".br"), ("gzip", ".gz")):
+            # The quality, so "br;q=0" refuses it and a mere substring never matches
+            if request.accept_encodings[candidate] > 0 and os.path.isfile(path + suffix):
+                encoding, variant = candidate, filename + suffix
+                break
+        response = send_from_directory(self.out_dir, variant, mimetype=mimetype, max_age=31536000,
+                                       download_name=os.path.basename(filename))
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.headers["Vary"] = "Accept-Encoding"
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
@@ -0,0 +1,96 @@
+import hashlib
+import math
+import threading
+from sqlalchemy import func
+from app import db
+from app.models import User
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings.
+
+    "Not present" answers are always right; "present" answers are wrong at
+    most error_rate of the time once capacity items have been added.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, value):
+        for pos in self._positions(value):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+
+class AvailabilityIndex:
+    """Answer "is this username/email free?" mostly without touching the database.
+
+    Built from the user table on first use and updated through user
+    invalidation events on registration.  A
+    miss in the filter means the name is free; a hit is confirmed with a
+    database lookup, since it may be a false positive.  Values are compared
+    exactly, as the UNIQUE constraints on user.username / user.email do, so
+    the answer matches what registration will accept and the confirming
+    lookup uses those constraints' indexes.
+    """
+
+    FIELDS = {"username": User.username, "email": User.email}
+
+    def __init__(self, capacity=100000, error_rate=0.01):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.filters = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        count = db.session.query(func.count(User.id)).scalar()
+        # Leave room to grow so the false-positive rate holds until the next restart
+        capacity = max(self.capacity, count * 2)
+        filters = {field: BloomFilter(capacity, self.error_rate) for field in self.FIELDS}
+        for username, email in db.session.query(User.username, User.email).yield_per(1000):
+            filters["username"].add(username)
+            filters["email"].add(email)
+        self.filters = filters
+
+    def ensure_loaded(self):
+        if self.filters is None:
+            with self._lock:
+                if self.filters is None:
+                    self.load()
+
+    def add(self, username, email):
+        self.ensure_loaded()
+        self.filters["username"].add(username)
+        self.filters["email"].add(email)
+
+    def refresh_user(self, user_id):
+        """Add a user created or changed by another worker; Bloom filters never need removals."""
+        if self.filters is None:
+            return
+        row = db.session.query(User.username, User.email).filter_by(id=user_id).first()
+        if row is not None:
+            self.add(row.username, row.email)
+
+    def reset(self):
+        with self._lock:
+            self.filters = None
+
+    def is_available(self, field, value):
+        self.ensure_loaded()
+        if value not in self.filters[field]:
+            return True
+        column = self.FIELDS[field]
+        taken = db.session.query(User.id).filter(column == value).first()
+        return taken is None
@@ -0,0 +1,198 @@
+import click
+from app import app, db, assets
+from app.notifications import send_pending_digests
+from app.task_delete import sweep_deleted_tasks
+from app.models import Todo, Comment, Tag, TodoTag
+from app.rich_text import RENDERER_VERSION, render
+from app.assets import build_assets
+from app.legacy_import import LegacyImporter
+from app.tags import extract_tags, set_task_tags
+from app import maintenance
+from app.schema import upgrade_database
+
+
+# -----------------------------
+# Notification Commands
+# -----------------------------
+@app.cli.command("send-digests")
+def send_digests_command():
+    """Send comment notification digests whose window has closed."""
+    sent = send_pending_digests()
+    click.echo(f"Sent digests to {sent} recipient(s).")
+
+
+# -----------------------------
+# Task Cleanup Commands
+# -----------------------------
+@app.cli.command("sweep-deleted")
+@click.option("--chunk-size", default=None, type=int, help="Comments deleted per transaction.")
+def sweep_deleted_command(chunk_size):
+    """Remove soft-deleted tasks and their comment threads."""
+    removed = sweep_deleted_tasks(chunk_size or app.config["TASK_SWEEP_CHUNK_SIZE"])
+    click.echo(f"Removed {removed} comment(s) from deleted tasks.")
+
+
+# -----------------------------
+# Rich Text Commands
+# -----------------------------
+@app.cli.command("rerender-rich-text")
+@click.option("--batch-size", default=500, help="Rows updated per transaction.")
+def rerender_rich_text_command(batch_size):
+    """Re-render stored task/comment HTML made by an older renderer version."""
+    for model in (Todo, Comment):
+        stale = db.or_(model.content_render_version.is_(None), model.content_render_version != RENDERER_VERSION)
+        last_id = 0
+        total = 0
+        while True:
+            # Keyset paging on id so each batch is an index range scan
+            rows = db.session.execute(
+                db.select(model.id, model.content).where(stale, model.id > last_id).order_by(model.id).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            db.session.execute(db.update(model), [
+                {"id": row.id, "content_html": render(row.content), "content_render_version": RENDERER_VERSION}
+                for row in rows
+            ])
+            db.session.commit()
+            last_id = rows[-1].id
+            total += len(rows)
+        click.echo(f"Re-rendered {total} {model.__tablename__} row(s) at renderer version {RENDERER_VERSION}.")
+
+
+# -----------------------------
+# Tag Commands
+# -----------------------------
+@app.cli.command("reindex-tags")
+@click.option("--batch-size", default=500, help="Tasks processed per transaction.")
+def reindex_tags_command(batch_size):
+    """Rebuild task tags from #hashtags in task content and recount every tag."""
+    last_id = 0
+    total = 0
+    while True:
+        rows = db.session.execute(
+            db.select(Todo.id, Todo.content)
+            .where(Todo.id > last_id, Todo.deleted_at.is_(None))
+            .order_by(Todo.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        for row in rows:
+            set_task_tags(row.id, extract_tags(row.content))
+        db.session.commit()
+        last_id = rows[-1].id
+        total += len(rows)
+    # Counters are maintained incrementally; this resets any drift
+    db.session.execute(db.update(Tag).values(
+        task_count=db.select(db.func.count()).where(TodoTag.tag_id == Tag.id).scalar_subquery()
+    ))
+    db.session.commit()
+    click.echo(f"Reindexed tags on {total} task(s).")
+
+
+# -----------------------------
+# Static Asset Commands
+# -----------------------------
+@app.cli.command("build-assets")
+@click.option("--optimize-images", is_flag=True, help="Recompress PNG/JPEG files (needs Pillow).")
+def build_assets_command(optimize_images):
+    """Write fingerprinted, precompressed copies of app/static for /assets/."""
+    manifest = build_assets(app.static_folder, assets.out_dir, optimize_images=optimize_images)
+    for name, hashed in sorted(manifest.items()):
+        click.echo(f"{name} -> {hashed}")
+
+
+# -----------------------------
+# Legacy Import Commands
+# -----------------------------
+@app.cli.command("import-legacy")
+@click.argument("sources", nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option("--chunk-size", default=1000, help="Rows read and written per transaction.")
+def import_legacy_command(sources, chunk_size):
+    """Stream users, tasks, comments and follows from older app databases.
+
+    SOURCES are the legacy SQLite files, e.g. ../login/instance/user.db.
+    Progress is checkpointed per chunk, so re-running resumes where the
+    last run stopped and never imports a row twice.
+    """
+    for source in sources:
+        LegacyImporter(source, chunk_size=chunk_size, log=click.echo).run()
+
+
+# -----------------------------
+# Schema Commands
+# -----------------------------
+@app.cli.command("db-upgrade")
+def db_upgrade_command():
+    """Create missing tables and add columns/indexes introduced since the database was made.
+
+    Run once per deploy before starting `flask run` or a WSGI server
+    (python run.py does it itself).  Importing the app never changes the schema.
+    """
+    upgrade_database()
+    click.echo("Database schema is up to date.")
+
+
+# -----------------------------
+# Database Maintenance Commands
+# -----------------------------
+# Each works on the live SQLite file through its own connection and prints
+# how long it took and how many pages it touched, so it can be scheduled
+# while the app is serving traffic.
+def sqlite_path():
+    path = maintenance.database_path()
+    if path is None:
+        raise click.ClickException("Database maintenance commands only support a file-backed SQLite database.")
+    return path
+
+
+@app.cli.command("db-backup")
+@click.argument("dest", type=click.Path(dir_okay=False))
+@click.option("--pages", default=256, help="Pages copied per step.")
+@click.option("--sleep-ms", default=10, help="Pause between steps, letting writers in.")
+@click.option("--max-restarts", default=10, help="Give up after the copy restarts this often because of writes.")
+def db_backup_command(dest, pages, sleep_ms, max_restarts):
+    """Take a consistent hot backup of the database into DEST."""
+    stats = maintenance.backup(sqlite_path(), dest, pages=pages, sleep=sleep_ms / 1000, max_restarts=max_restarts)
+    if stats is None:
+        raise click.ClickException(f"Backup restarted more than {max_restarts} times because of concurrent writes; "
+                                   "try again when it is quieter or with a larger --pages.")
+    click.echo(f"Backed up {stats['pages']} pages in {stats['steps']} steps with {stats['restarts']} restart(s) "
+               f"to {dest} ({stats['seconds']:.2f}s).")
+
+
+@app.cli.command("db-analyze")
+def db_analyze_command():
+    """Gather query planner statistics (ANALYZE, PRAGMA optimize)."""
+    stats = maintenance.analyze(sqlite_path())
+    click.echo(f"Analyzed {stats['pages']} pages ({stats['seconds']:.2f}s).")
+
+
+@app.cli.command("db-vacuum")
+@click.option("--chunk-pages", default=128, help="Free pages released per transaction.")
+@click.option("--max-seconds", default=None, type=float, help="Stop after this long; the rest waits for the next run.")
+@click.option("--enable", is_flag=True, help="Switch the file to incremental auto-vacuum first (one full, blocking VACUUM).")
+def db_vacuum_command(chunk_pages, max_seconds, enable):
+    """Release free pages left by deleted rows in small incremental-vacuum chunks."""
+    path = sqlite_path()
+    if enable:
+        stats = maintenance.enable_incremental_vacuum(path)
+        click.echo(f"Enabled incremental auto-vacuum; rewrote {stats['pages']} pages ({stats['seconds']:.2f}s).")
+    stats = maintenance.incremental_vacuum(path, chunk_pages=chunk_pages, max_seconds=max_seconds)
+    if stats is None:
+        raise click.ClickException("The database is not in incremental auto-vacuum mode; run once with --enable.")
+    click.echo(f"Freed {stats['pages']} pages in {stats['chunks']} chunks, {stats['remaining']} free pages left "
+               f"({stats['seconds']:.2f}s).")
+
+
+@app.cli.command("db-check")
+@click.option("--quick", is_flag=True, help="Run quick_check (skips index contents and foreign keys).")
+def db_check_command(quick):
+    """Check the database file for corruption."""
+    stats = maintenance.integrity_check(sqlite_path(), quick=quick)
+    for error in stats["errors"]:
+        click.echo(error)
+    status = "FAILED" if stats["errors"] else "ok"
+    click.echo(f"Integrity check {status}: {stats['pages']} pages ({stats['seconds']:.2f}s).")
+    if stats["errors"]:
+        raise SystemExit(1)
@@ -0,0 +1,43 @@
+from sqlalchemy import select, literal
+from app import db, invalidation_bus
+from app.invalidation import FOLLOW
+from app.sql_compat import dialect_insert
+from app import inbox
+from app.models import User, Follow
+
+
+def follow_many(follower_id, user_ids):
+    """Follow every existing user in user_ids in one statement.
+
+    Runs INSERT INTO follow SELECT ... FROM user WHERE id IN (...) ON CONFLICT
+    DO NOTHING, so unknown ids and existing follows are skipped by the
+    database instead of checked first, and concurrent clicks cannot collide
+    on the primary key.  Returns the ids that were newly followed.
+    """
+    user_ids = {int(user_id) for user_id in user_ids} - {follower_id}
+    if not user_ids:
+        return []
+    targets = select(literal(follower_id), User.id).where(User.id.in_(user_ids))
+    stmt = (dialect_insert(Follow)
+            .from_select([Follow.follower_id, Follow.followee_id], targets)
+            .on_conflict_do_nothing()
+            .returning(Follow.followee_id))
+    followed = list(db.session.execute(stmt).scalars())
+    inbox.push_many([(followee_id, follower_id, inbox.FOLLOW, None) for followee_id in followed])
+    db.session.commit()
+    invalidation_bus.publish_many(FOLLOW, [(follower_id, followee_id) for followee_id in followed])
+    return followed
+
+
+def unfollow_many(follower_id, user_ids):
+    """Unfollow every user in user_ids with a single DELETE; returns the ids removed."""
+    user_ids = {int(user_id) for user_id in user_ids}
+    if not user_ids:
+        return []
+    stmt = (db.delete(Follow)
+            .where(Follow.follower_id == follower_id, Follow.followee_id.in_(user_ids))
+            .returning(Follow.followee_id))
+    unfollowed = list(db.session.execute(stmt).scalars())
+    db.session.commit()
+    invalidation_bus.publish_many(FOLLOW, [(follower_id, followee_id) for followee_id in unfollowed])
+    return unfollowed
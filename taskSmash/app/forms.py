@@ -1,6 +1,7 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, SubmitField
-from wtforms.validators import DataRequired, Email, Length
+from wtforms import StringField, PasswordField, SubmitField, SelectField, DateTimeLocalField
+from wtforms.validators import DataRequired, Email, Length, Optional
+from app.models import PRIORITIES
 
 class LoginForm(FlaskForm):
     username = StringField('Username', validators=[DataRequired(), Length(min=2, max=50)])
@@ -15,4 +16,6 @@ class RegisterForm(FlaskForm):
 
 class EditTaskForm(FlaskForm):
     content = StringField('Task', validators=[DataRequired(), Length(max=200)])
+    due_at = DateTimeLocalField('Due', format='%Y-%m-%dT%H:%M', validators=[Optional()])
+    priority = SelectField('Priority', coerce=int, choices=sorted(PRIORITIES.items()))
     submit = SubmitField('Update Task')
\ No newline at end of file
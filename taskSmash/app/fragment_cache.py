@@ -0,0 +1,61 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class FragmentCache:
+    """Small in-process LRU cache of rendered HTML fragments with a TTL.
+
+    Entries are dropped through task invalidation events when the data
+    behind them changes; the TTL is a backstop if the bus is disabled.
+
+    A fill reads the data, renders, then calls set().  An invalidation that
+    lands in between would be undone by that set(), so callers take
+    generation(key) before reading and pass it to set(), which skips the
+    write if the key was invalidated since.  Generations are kept per
+    stripe of keys, so memory stays fixed; a collision only skips a fill.
+    """
+
+    STRIPES = 256
+
+    def __init__(self, max_entries=1000, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._generations = [0] * self.STRIPES
+        self._lock = threading.Lock()
+
+    def generation(self, key):
+        with self._lock:
+            return self._generations[hash(key) % self.STRIPES]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, html = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return html
+
+    def set(self, key, html, generation=None):
+        with self._lock:
+            if generation is not None and generation != self._generations[hash(key) % self.STRIPES]:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, html)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generations[hash(key) % self.STRIPES] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations = [generation + 1 for generation in self._generations]
@@ -0,0 +1,152 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError, TimeoutError
+
+
+class GroupCommitter:
+    """Collect small inserts from many requests and commit them together.
+
+    Each call to submit() queues one row and returns a Future.  A background
+    thread takes the first waiting row and everything queued behind it.  A
+    lone writer is committed straight away; when other rows are already
+    waiting (concurrent writers) it keeps gathering until either max_batch
+    rows are waiting or max_delay seconds have passed since the first one
+    arrived.  The whole batch is written in a single transaction (one fsync
+    on SQLite) and every Future is resolved with the primary key of its own
+    row.  If the thread dies, every row it had not written fails at once.
+    """
+
+    def __init__(self, app=None, db=None, max_batch=64, max_delay=0.005, timeout=5.0):
+        self.db = db
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.app = None
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db=None):
+        self.app = app
+        if db is not None:
+            self.db = db
+        self.max_batch = app.config.get("GROUP_COMMIT_MAX_BATCH", self.max_batch)
+        self.max_delay = app.config.get("GROUP_COMMIT_MAX_DELAY_MS", self.max_delay * 1000) / 1000.0
+        self.timeout = app.config.get("GROUP_COMMIT_TIMEOUT_MS", self.timeout * 1000) / 1000.0
+
+    @property
+    def enabled(self):
+        return bool(self.app and self.app.config.get("GROUP_COMMIT_ENABLED"))
+
+    def submit(self, model, **values):
+        """Queue one row for `model` and return a Future for its new id."""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((model, values, future))
+        return future
+
+    def insert(self, model, **values):
+        """Insert a row and block until it is durable, returning its id.
+
+        If the writer has not picked the row up within `timeout` seconds it
+        is withdrawn from the queue and committed directly instead.  A row
+        the writer is already writing is waited for once more, then the
+        TimeoutError is raised; the row is never written twice.
+        """
+        future = self.submit(model, **values)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            if not future.cancel():
+                return future.result(timeout=self.timeout)
+        return self._write([(model, values, None)])[0]
+
+    # -----------------------------
+    # Background writer
+    # -----------------------------
+    def _ensure_started(self):
+        # Started lazily so the reloader / forked workers each get their own thread
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        batch = []
+        try:
+            while True:
+                batch = [self._queue.get()]
+                self._drain(batch)
+                if len(batch) == 1:
+                    # Nobody else is writing, so waiting would only add latency
+                    self._flush(batch)
+                    continue
+                deadline = time.monotonic() + self.max_delay
+                while len(batch) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+                self._flush(batch)
+        except BaseException as e:
+            self.app.logger.exception("Group commit writer stopped; failing its pending rows")
+            self._fail_pending(batch, e)
+
+    def _fail_pending(self, batch, cause):
+        # Callers would otherwise wait out their timeout for a writer that is gone
+        error = RuntimeError("group commit writer stopped")
+        error.__cause__ = cause
+        while True:
+            for _, _, future in batch:
+                try:
+                    future.set_exception(error)
+                except InvalidStateError:
+                    pass  # already resolved or withdrawn by insert()
+            batch = []
+            self._drain(batch)
+            if not batch:
+                return
+
+    def _drain(self, batch):
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                return
+
+    def _flush(self, batch):
+        # Rows whose insert() gave up waiting are withdrawn; the rest can no longer be cancelled
+        batch[:] = [item for item in batch if item[2].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        with self.app.app_context():
+            try:
+                ids = self._write(batch)
+            except Exception:
+                # One bad row should not fail everyone else in the batch,
+                # so retry each row in its own transaction.
+                for item in batch:
+                    try:
+                        ids = self._write([item])
+                        item[2].set_result(ids[0])
+                    except Exception as e:
+                        item[2].set_exception(e)
+                return
+        for (_, _, future), new_id in zip(batch, ids):
+            future.set_result(new_id)
+
+    def _write(self, batch):
+        ids = []
+        with self.db.engine.begin() as conn:
+            for model, values, _ in batch:
+                result = conn.execute(model.__table__.insert().values(**values))
+                ids.append(result.inserted_primary_key[0])
+        return ids
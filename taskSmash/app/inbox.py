@@ -0,0 +1,85 @@
+from collections import Counter
+from sqlalchemy import select, func
+from flask_login import current_user
+from app import db
+from app.sql_compat import dialect_insert
+from app.models import InboxItem, InboxCounter, User, Todo
+
+# InboxItem.kind codes
+COMMENT = 1  # someone commented on your task
+REPLY = 2  # someone replied on your task or to your comment
+FOLLOW = 3  # someone followed you
+KINDS = {"comment": COMMENT, "reply": REPLY, "follow": FOLLOW}
+PAGE_SIZE = 30
+
+
+def push_many(items):
+    """Append (recipient_id, actor_id, kind, task_id) items and bump unread counters. The caller commits.
+
+    Counters are upserted in the same transaction as the items, so the
+    unread badge never needs a COUNT(*) over the inbox.
+    """
+    items = [item for item in items if item[0] != item[1]]  # nothing for acting on your own things
+    if not items:
+        return
+    db.session.execute(db.insert(InboxItem), [
+        {"recipient_id": recipient_id, "actor_id": actor_id, "kind": kind, "task_id": task_id}
+        for recipient_id, actor_id, kind, task_id in items
+    ])
+    added = Counter(recipient_id for recipient_id, _, _, _ in items)
+    stmt = dialect_insert(InboxCounter)
+    db.session.execute(
+        stmt.on_conflict_do_update(index_elements=["user_id"],
+                                   set_={"unread": InboxCounter.unread + stmt.excluded.unread}),
+        [{"user_id": user_id, "unread": count, "last_read_id": 0} for user_id, count in added.items()]
+    )
+
+
+def push(recipient_id, actor_id, kind, task_id=None):
+    push_many([(recipient_id, actor_id, kind, task_id)])
+
+
+def unread_count():
+    """Unread badge for base.html: one primary-key lookup."""
+    if not current_user.is_authenticated:
+        return 0
+    return db.session.query(InboxCounter.unread).filter_by(user_id=current_user.id).scalar() or 0
+
+
+def inbox_page(user_id, before=None, limit=PAGE_SIZE):
+    """Newest-first page of a user's inbox, read from ix_inbox_item_recipient."""
+    actor = db.aliased(User)
+    stmt = (select(InboxItem.id, InboxItem.kind, InboxItem.task_id, InboxItem.created_at,
+                   actor.username.label("actor"), Todo.content.label("task_content"))
+            .join(actor, actor.id == InboxItem.actor_id)
+            .outerjoin(Todo, (Todo.id == InboxItem.task_id) & Todo.deleted_at.is_(None))
+            .where(InboxItem.recipient_id == user_id)
+            .order_by(InboxItem.id.desc())
+            .limit(limit))
+    if before is not None:
+        stmt = stmt.where(InboxItem.id < before)
+    return db.session.execute(stmt).all()
+
+
+def mark_read(user_id, up_to_id):
+    """Mark items up to up_to_id read and return the previous last_read_id. Commits.
+
+    A single UPDATE recounts what is left above up_to_id (on the index
+    range) and only ever moves last_read_id forward.  Counting inside the
+    write means an item pushed concurrently is either counted here or adds
+    to the counter afterwards, never lost in between, and items that
+    arrived while the page was being built stay unread.
+    """
+    previous = db.session.query(InboxCounter.last_read_id).filter_by(user_id=user_id).scalar()
+    if previous is None or up_to_id <= previous:
+        return previous or 0
+    unread = (select(func.count(InboxItem.id))
+              .where(InboxItem.recipient_id == user_id, InboxItem.id > up_to_id)
+              .scalar_subquery())
+    db.session.execute(
+        db.update(InboxCounter)
+        .where(InboxCounter.user_id == user_id, InboxCounter.last_read_id < up_to_id)
+        .values(unread=unread, last_read_id=up_to_id)
+    )
+    db.session.commit()
+    return previous
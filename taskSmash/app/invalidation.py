@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import defaultdict
+from sqlalchemy import select, insert, delete
+from app import db
+from app.models import CacheInvalidation
+
+# Event kinds.  subject_id / object_id mean:
+TASK = "task"  # task id; its comments or content changed
+FOLLOW = "follow"  # follower id, followee id; the edge was added or removed
+USER = "user"  # user id; account details changed or the account is new
+
+
+class InvalidationBus:
+    """Tell every worker process which cached data just changed.
+
+    publish() is called after a write has been committed.  It runs the local
+    handlers at once and appends the event to the cache_invalidation table.
+    Every worker polls that table by id before handling a request, at most
+    once per INVALIDATION_POLL_INTERVAL, and runs its handlers for each new
+    event, so a stale entry outlives a write in another worker by at most
+    one poll interval.  SQLite serializes writers, so ids become visible in
+    order.  Ids may have gaps (rolled-back inserts), which are harmless; only
+    when trimming has removed events after the last one a worker saw, i.e.
+    the oldest retained id is past last_id + 1, does it run its reset
+    handlers instead.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self.handlers = defaultdict(list)
+        self.reset_handlers = []
+        self.last_id = None
+        self._next_poll = 0.0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config["INVALIDATION_ENABLED"]
+        self.poll_interval = app.config["INVALIDATION_POLL_INTERVAL"]
+        self.retain = app.config["INVALIDATION_RETAIN"]
+        if self.enabled:
+            app.before_request(self.poll)
+
+    def subscribe(self, kind, handler):
+        """Call handler(subject_id, object_id) for every event of this kind."""
+        self.handlers[kind].append(handler)
+
+    def on_reset(self, handler):
+        """Call handler() when events were missed and everything must be dropped."""
+        self.reset_handlers.append(handler)
+
+    # -----------------------------
+    # Publishing
+    # -----------------------------
+    def publish(self, kind, subject_id, object_id=None):
+        self.publish_many(kind, [(subject_id, object_id)])
+
+    def publish_many(self, kind, events):
+        events = list(events)
+        if not events:
+            return
+        for subject_id, object_id in events:
+            self.dispatch(kind, subject_id, object_id)
+        if not self.enabled:
+            return
+        ids = db.session.execute(insert(CacheInvalidation).returning(CacheInvalidation.id), [
+            {"kind": kind, "subject_id": subject_id, "object_id": object_id} for subject_id, object_id in events
+        ]).scalars().all()
+        newest = max(ids)
+        # Trim the log now and then; the newest rows are never removed, so ids keep increasing
+        if newest // 100 != (newest - len(ids)) // 100:
+            db.session.execute(delete(CacheInvalidation).where(CacheInvalidation.id <= newest - self.retain))
+        db.session.commit()
+
+    def dispatch(self, kind, subject_id, object_id):
+        for handler in self.handlers[kind]:
+            handler(subject_id, object_id)
+
+    # -----------------------------
+    # Polling
+    # -----------------------------
+    def poll(self, force=False):
+        now = time.monotonic()
+        if not force and now < self._next_poll:
+            return
+        with self._lock:
+            if not force and now < self._next_poll:
+                return
+            self._next_poll = now + self.poll_interval
+            with db.engine.connect() as conn:
+                if self.last_id is None:
+                    # Caches start empty, so older events do not matter
+                    self.last_id = conn.execute(select(db.func.max(CacheInvalidation.id))).scalar() or 0
+                    return
+                rows = conn.execute(
+                    select(CacheInvalidation.id, CacheInvalidation.kind,
+                           CacheInvalidation.subject_id, CacheInvalidation.object_id)
+                    .where(CacheInvalidation.id > self.last_id)
+                    .order_by(CacheInvalidation.id)
+                ).all()
+                if not rows:
+                    return
+                # Read after the new rows, so a trim racing with this poll is noticed
+                oldest = conn.execute(select(db.func.min(CacheInvalidation.id))).scalar()
+            if oldest > self.last_id + 1:
+                # Trimming removed events this worker had not seen yet
+                for handler in self.reset_handlers:
+                    handler()
+            else:
+                for row in rows:
+                    self.dispatch(row.kind, row.subject_id, row.object_id)
+            self.last_id = rows[-1].id
@@ -0,0 +1,243 @@
+import os
+import sqlite3
+import time
+from datetime import datetime
+from sqlalchemy import select, insert, or_, func, bindparam
+from app import db, invalidation_bus
+from app.invalidation import USER, FOLLOW
+from app.sql_compat import dialect_insert
+from app.models import User, Todo, Comment, Follow, LegacyIdMap, LegacyImportCheckpoint
+from app.rich_text import rendered_fields
+from app.schema import upgrade_database
+from app.tags import extract_tags, set_task_tags
+
+# Older apps (login, todoSocial_basic, CTEC295project-master, Updates) used
+# `created` instead of `created_at`, had no Comment.parent_id and sometimes
+# no User.email.  Users without an email get a placeholder address here.
+PLACEHOLDER_EMAIL_DOMAIN = "legacy.invalid"
+
+
+class LegacyImporter:
+    """Stream one legacy SQLite file into the taskSmash database.
+
+    Tables are read in id order, chunk_size rows at a time.  Each chunk's
+    new rows, id mappings and checkpoint are written in one transaction, so
+    an interrupted run picks up after the last finished chunk.  New users
+    and follow edges are published on the invalidation bus once their chunk
+    is committed, so caches in running workers pick them up.
+    """
+
+    TABLES = ("user", "todo", "comment", "follow")
+
+    def __init__(self, path, chunk_size=1000, log=print):
+        self.path = path
+        self.source = os.path.abspath(path)
+        self.chunk_size = chunk_size
+        self.log = log
+        self.pending = []
+        self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        self.conn.row_factory = sqlite3.Row
+        self.columns = {
+            name: [row["name"] for row in self.conn.execute(f'PRAGMA table_info("{name}")')]
+            for (name,) in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        }
+
+    def run(self):
+        # The target may predate the newer columns and the bookkeeping tables
+        upgrade_database()
+        for table in self.TABLES:
+            if table in self.columns:
+                self.import_table(table)
+        self.conn.close()
+
+    # -----------------------------
+    # Bookkeeping
+    # -----------------------------
+    def checkpoint(self, table):
+        point = db.session.get(LegacyImportCheckpoint, (self.source, table))
+        if point is None:
+            point = LegacyImportCheckpoint(source=self.source, table_name=table, last_id=0, rows=0)
+            db.session.add(point)
+        return point
+
+    def id_map(self, table, old_ids):
+        if not old_ids:
+            return {}
+        rows = db.session.execute(
+            select(LegacyIdMap.old_id, LegacyIdMap.new_id).where(
+                LegacyIdMap.source == self.source,
+                LegacyIdMap.table_name == table,
+                LegacyIdMap.old_id.in_(old_ids))
+        )
+        return dict(rows.all())
+
+    def remember(self, table, pairs):
+        if pairs:
+            db.session.execute(insert(LegacyIdMap), [
+                {"source": self.source, "table_name": table, "old_id": old, "new_id": new} for old, new in pairs
+            ])
+
+    def publish(self):
+        for kind, events in self.pending:
+            invalidation_bus.publish_many(kind, events)
+        self.pending = []
+
+    def insert_returning_ids(self, model, rows):
+        if not rows:
+            return []
+        stmt = insert(model).returning(model.id, sort_by_parameter_order=True)
+        return list(db.session.execute(stmt, rows).scalars())
+
+    # -----------------------------
+    # Streaming
+    # -----------------------------
+    def chunks(self, table, after):
+        key = "id" if "id" in self.columns[table] else "rowid"
+        while True:
+            rows = self.conn.execute(
+                f'SELECT {key} AS _key, * FROM "{table}" WHERE {key} > ? ORDER BY {key} LIMIT ?',
+                (after, self.chunk_size)
+            ).fetchall()
+            if not rows:
+                return
+            yield rows
+            after = rows[-1]["_key"]
+
+    def import_table(self, table):
+        point = self.checkpoint(table)
+        db.session.commit()
+        start = time.perf_counter()
+        imported = skipped = 0
+        for rows in self.chunks(table, point.last_id):
+            written = getattr(self, f"import_{table}s")(rows)
+            point = self.checkpoint(table)
+            point.last_id = rows[-1]["_key"]
+            point.rows += written
+            db.session.commit()
+            self.publish()
+            imported += written
+            skipped += len(rows) - written
+        elapsed = time.perf_counter() - start
+        rate = imported / elapsed if elapsed else 0
+        self.log(f"{os.path.basename(os.path.dirname(os.path.dirname(self.source)))}/{table}: "
+                 f"{imported} imported, {skipped} skipped, {rate:,.0f} rows/s")
+
+    # -----------------------------
+    # Per-table mapping
+    # -----------------------------
+    def import_users(self, rows):
+        has_email = "email" in self.columns["user"]
+        legacy = []
+        for row in rows:
+            email = row["email"] if has_email else None
+            legacy.append((row["id"], row["username"], email or f"{row['username']}@{PLACEHOLDER_EMAIL_DOMAIN}",
+                           row["password_hash"]))
+
+        # Same username or email (ignoring case) as an existing account means the same person
+        usernames = [username.lower() for _, username, _, _ in legacy]
+        emails = [email.lower() for _, _, email, _ in legacy]
+        existing = db.session.execute(
+            select(User.id, User.username, User.email).where(
+                or_(func.lower(User.username).in_(usernames), func.lower(User.email).in_(emails)))
+        ).all()
+        by_username = {row.username.lower(): row.id for row in existing}
+        by_email = {row.email.lower(): row.id for row in existing}
+
+        pairs, new_rows, new_old_ids, duplicates = [], [], [], []
+        for old_id, username, email, password_hash in legacy:
+            match = by_username.get(username.lower()) or by_email.get(email.lower())
+            if isinstance(match, int):
+                pairs.append((old_id, match))
+            elif match is not None:
+                # Collides with a user inserted earlier in this chunk
+                duplicates.append((old_id, match))
+            else:
+                pending = ("new", len(new_rows))
+                new_rows.append({"username": username, "email": email, "password_hash": password_hash})
+                new_old_ids.append(old_id)
+                by_username[username.lower()] = by_email[email.lower()] = pending
+        new_ids = self.insert_returning_ids(User, new_rows)
+        self.pending.append((USER, [(user_id, None) for user_id in new_ids]))
+        pairs += zip(new_old_ids, new_ids)
+        pairs += [(old_id, new_ids[index]) for old_id, (_, index) in duplicates]
+        self.remember("user", pairs)
+        return len(pairs)
+
+    def _created(self, row):
+        for column in ("created_at", "created"):
+            if column in row.keys() and row[column] is not None:
+                return _parse_datetime(row[column])
+        return None
+
+    def import_todos(self, rows):
+        users = self.id_map("user", {row["user_id"] for row in rows})
+        old_ids, new_rows = [], []
+        for row in rows:
+            if row["user_id"] not in users:
+                continue
+            old_ids.append(row["id"])
+            values = {"content": row["content"], "user_id": users[row["user_id"]], **rendered_fields(row["content"])}
+            created = self._created(row)
+            if created is not None:
+                values["created_at"] = created
+            new_rows.append(values)
+        new_ids = self.insert_returning_ids(Todo, new_rows)
+        self.remember("todo", zip(old_ids, new_ids))
+        for task_id, values in zip(new_ids, new_rows):
+            set_task_tags(task_id, extract_tags(values["content"]))
+        return len(new_rows)
+
+    def import_comments(self, rows):
+        has_parent = "parent_id" in self.columns["comment"]
+        users = self.id_map("user", {row["user_id"] for row in rows})
+        tasks = self.id_map("todo", {row["task_id"] for row in rows})
+        parents = self.id_map("comment", {row["parent_id"] for row in rows if has_parent and row["parent_id"]})
+        old_ids, new_rows, pending_parents = [], [], []
+        for row in rows:
+            if row["user_id"] not in users or row["task_id"] not in tasks:
+                continue
+            values = {"content": row["content"], "user_id": users[row["user_id"]], "task_id": tasks[row["task_id"]],
+                      "parent_id": None, **rendered_fields(row["content"])}
+            if has_parent and row["parent_id"]:
+                if row["parent_id"] in parents:
+                    values["parent_id"] = parents[row["parent_id"]]
+                else:
+                    # Probably a comment later in this chunk; linked once it has an id
+                    pending_parents.append((len(new_rows), row["parent_id"]))
+            created = self._created(row)
+            if created is not None:
+                values["created_at"] = created
+            old_ids.append(row["id"])
+            new_rows.append(values)
+
+        # One executemany for the chunk, then one for replies to comments in it
+        new_ids = self.insert_returning_ids(Comment, new_rows)
+        chunk_ids = dict(zip(old_ids, new_ids))
+        links = [{"comment_id": new_ids[index], "parent": chunk_ids[parent]}
+                 for index, parent in pending_parents if parent in chunk_ids]
+        if links:
+            table = Comment.__table__
+            db.session.execute(
+                db.update(table).where(table.c.id == bindparam("comment_id")).values(parent_id=bindparam("parent")),
+                links
+            )
+        self.remember("comment", chunk_ids.items())
+        return len(new_rows)
+
+    def import_follows(self, rows):
+        users = self.id_map("user", {row["follower_id"] for row in rows} | {row["followee_id"] for row in rows})
+        new_rows = [
+            {"follower_id": users[row["follower_id"]], "followee_id": users[row["followee_id"]]}
+            for row in rows
+            if row["follower_id"] in users and row["followee_id"] in users
+        ]
+        if new_rows:
+            db.session.execute(dialect_insert(Follow).on_conflict_do_nothing(), new_rows)
+            self.pending.append((FOLLOW, [(row["follower_id"], row["followee_id"]) for row in new_rows]))
+        return len(new_rows)
+
+
+def _parse_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
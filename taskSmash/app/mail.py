@@ -1,3 +1,4 @@
+import json
 import requests
 from flask import current_app
 
@@ -8,7 +9,7 @@ def send_mailgun_email(recipient, subject, body):
     SENDER_EMAIL = current_app.config.get("SENDER_EMAIL")
     
     response = requests.post(
-        f"https://api.mailgun.net/v3/{MAILGUN_DOMAIN}/messages",
+        f"{current_app.config.get('MAILGUN_API_BASE')}/{MAILGUN_DOMAIN}/messages",
         auth=("api", MAILGUN_API_KEY),
         data={
             "from": f"Password Reset <{SENDER_EMAIL}>",
@@ -19,4 +20,29 @@ def send_mailgun_email(recipient, subject, body):
     )
     print(f"Status Code: {response.status_code}")
     print(f"Response Body: {response.text}")
+    return response
+
+
+def send_mailgun_batch(recipient_variables, subject, body):
+    """Send one email to many recipients with a single Mailgun API call.
+
+    recipient_variables maps each address to a dict of values that Mailgun
+    substitutes into %recipient.<name>% placeholders in subject and body.
+    """
+    MAILGUN_DOMAIN = current_app.config.get("MAILGUN_DOMAIN")
+    MAILGUN_API_KEY = current_app.config.get("MAILGUN_API_KEY")
+    SENDER_EMAIL = current_app.config.get("SENDER_EMAIL")
+
+    response = requests.post(
+        f"{current_app.config.get('MAILGUN_API_BASE')}/{MAILGUN_DOMAIN}/messages",
+        auth=("api", MAILGUN_API_KEY),
+        data={
+            "from": f"TaskSmash <{SENDER_EMAIL}>",
+            "to": list(recipient_variables),
+            "subject": subject,
+            "text": body,
+            "recipient-variables": json.dumps(recipient_variables)
+        }
+    )
+    print(f"Batch of {len(recipient_variables)} - Status Code: {response.status_code}")
     return response
\ No newline at end of file
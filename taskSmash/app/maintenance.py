@@ -0,0 +1,144 @@
+import os
+import sqlite3
+import time
+from app import db
+
+
+def database_path():
+    """Filesystem path of the app's SQLite database, or None for other backends."""
+    url = db.engine.url
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return None
+    return url.database
+
+
+def connect(path, busy_timeout_ms=5000):
+    # Autocommit mode, so every statement below is its own short transaction
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+    return conn
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def backup(path, dest, pages=256, sleep=0.01, max_restarts=10, progress=None):
+    """Copy the live database to dest with SQLite's online backup API.
+
+    `pages` are copied per step and the source is left unlocked for
+    `sleep` seconds in between, so writers keep going.  If another
+    connection writes meanwhile, SQLite notices and restarts the copy, so
+    the result is always a consistent snapshot.  A busy database could keep
+    that going forever, so after `max_restarts` restarts the backup gives up
+    and None is returned (more pages per step make a restart less likely).
+    The copy is written beside dest and renamed into place once complete.
+    """
+    tmp = dest + ".partial"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    start = time.perf_counter()
+    source = connect(path)
+    target = sqlite3.connect(tmp)
+    steps = restarts = 0
+    last_remaining = None
+
+    def on_step(status, remaining, total):
+        nonlocal steps, restarts, last_remaining
+        steps += 1
+        if status == sqlite3.SQLITE_OK and last_remaining is not None and remaining >= last_remaining:
+            # A step went through but nothing is closer to done: copying started over from the first page
+            restarts += 1
+            if restarts > max_restarts:
+                raise _TooManyRestarts()
+        last_remaining = remaining
+        if progress is not None:
+            progress(total - remaining, total)
+        if remaining:
+            # The source is not locked while the callback runs
+            time.sleep(sleep)
+
+    try:
+        source.backup(target, pages=pages, progress=on_step)
+        total = target.execute("PRAGMA page_count").fetchone()[0]
+    except _TooManyRestarts:
+        total = None
+    finally:
+        target.close()
+        source.close()
+    if total is None:
+        os.remove(tmp)
+        return None
+    os.replace(tmp, dest)
+    return {"pages": total, "steps": steps, "restarts": restarts, "seconds": time.perf_counter() - start}
+
+
+def analyze(path):
+    """Refresh the query planner's statistics with ANALYZE, then PRAGMA optimize."""
+    conn = connect(path)
+    try:
+        start = time.perf_counter()
+        pages = conn.execute("PRAGMA page_count").fetchone()[0]
+        conn.execute("ANALYZE")
+        conn.execute("PRAGMA optimize")
+        return {"pages": pages, "seconds": time.perf_counter() - start}
+    finally:
+        conn.close()
+
+
+def auto_vacuum_mode(conn):
+    return {0: "none", 1: "full", 2: "incremental"}[conn.execute("PRAGMA auto_vacuum").fetchone()[0]]
+
+
+def enable_incremental_vacuum(path):
+    """Switch the file to auto_vacuum=INCREMENTAL; needs one full VACUUM, which blocks writers."""
+    conn = connect(path)
+    try:
+        start = time.perf_counter()
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        return {"pages": conn.execute("PRAGMA page_count").fetchone()[0], "seconds": time.perf_counter() - start}
+    finally:
+        conn.close()
+
+
+def incremental_vacuum(path, chunk_pages=128, max_seconds=None):
+    """Return free pages to the filesystem chunk_pages at a time.
+
+    Each chunk is its own short write transaction, so writers only wait
+    for one chunk.  Stops when the freelist is empty or max_seconds is up.
+    """
+    conn = connect(path)
+    try:
+        if auto_vacuum_mode(conn) != "incremental":
+            return None
+        start = time.perf_counter()
+        free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        chunks = 0
+        while conn.execute("PRAGMA freelist_count").fetchone()[0]:
+            if max_seconds is not None and time.perf_counter() - start >= max_seconds:
+                break
+            # execute() would step the pragma once (one page); executescript runs it to completion
+            conn.executescript(f"PRAGMA incremental_vacuum({int(chunk_pages)});")
+            chunks += 1
+        free_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return {"pages": free_before - free_after, "remaining": free_after, "chunks": chunks,
+                "seconds": time.perf_counter() - start}
+    finally:
+        conn.close()
+
+
+def integrity_check(path, quick=False, max_errors=100):
+    """Run PRAGMA quick_check / integrity_check; result["errors"] is empty when the file is sound."""
+    conn = connect(path)
+    try:
+        start = time.perf_counter()
+        pages = conn.execute("PRAGMA page_count").fetchone()[0]
+        pragma = "quick_check" if quick else "integrity_check"
+        rows = [row[0] for row in conn.execute(f"PRAGMA {pragma}({int(max_errors)})")]
+        errors = [] if rows == ["ok"] else rows
+        if not quick:
+            errors += [f"foreign key violation: {row}" for row in conn.execute("PRAGMA foreign_key_check")]
+        return {"pages": pages, "errors": errors, "seconds": time.perf_counter() - start}
+    finally:
+        conn.close()
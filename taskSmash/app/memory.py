@@ -0,0 +1,159 @@
+import gc
+import hmac
+import os
+import random
+import threading
+import tracemalloc
+from collections import Counter
+from flask import request, g, jsonify, abort
+
+# Allocations made by tracemalloc itself or the import machinery are noise
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+)
+
+
+def _site(frame):
+    """file:line, with installed packages shown from their package folder."""
+    filename = frame.filename
+    marker = "site-packages" + os.sep
+    if marker in filename:
+        filename = filename.split(marker, 1)[1]
+    return f"{filename}:{frame.lineno}"
+
+
+class RouteMemory:
+    """Running totals for one endpoint."""
+
+    def __init__(self):
+        self.samples = 0
+        self.peak_max = 0
+        self.peak_total = 0
+        self.retained_total = 0
+        self.retained_last = 0
+        self.leak_streak = 0  # consecutive samples that kept memory
+        self.sites = Counter()  # "file:line" -> bytes retained across samples
+
+    def as_dict(self, top):
+        return {
+            "samples": self.samples,
+            "peak_bytes_max": self.peak_max,
+            "peak_bytes_avg": self.peak_total // self.samples if self.samples else 0,
+            "retained_bytes_total": self.retained_total,
+            "retained_bytes_last": self.retained_last,
+            "leak_streak": self.leak_streak,
+            "top_sites": [{"site": site, "retained_bytes": size} for site, size in self.sites.most_common(top)],
+        }
+
+
+class MemoryTracker:
+    """Attribute memory growth to endpoints with tracemalloc snapshots.
+
+    Sampled requests (MEMORY_SAMPLE_RATE, or any request sending
+    MEMORY_HEADER) are bracketed by two snapshots.  Peak is the high-water
+    mark above the starting size while the request ran; retained is what is
+    still allocated once the request's database session is released and
+    garbage collected, broken down by allocation site.  An endpoint that
+    retains more than MEMORY_LEAK_MIN_BYTES on MEMORY_LEAK_STREAK samples
+    in a row is logged as a suspected leak.  Totals are served on
+    /debug/memory.  Outside debug mode both the header and that page need
+    MEMORY_SECRET as the header's value; without a secret the header is
+    ignored and the page is a 404.
+
+    tracemalloc is process-wide, so only one request is sampled at a time;
+    allocations by other threads during that request still count towards it.
+    """
+
+    def __init__(self, app=None, db=None):
+        self.app = app
+        self.db = db
+        self.routes = {}
+        self._sampling = threading.Lock()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        self.app = app
+        self.db = db
+        if not app.config.get("MEMORY_TRACKING_ENABLED"):
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(app.config["MEMORY_TRACE_FRAMES"])
+        app.before_request(self._before)
+        app.teardown_request(self._teardown)
+        app.add_url_rule("/debug/memory", "debug_memory", self.export)
+
+    def _snapshot(self):
+        gc.collect()
+        return tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+
+    def _before(self):
+        config = self.app.config
+        forced = self._header_allowed()
+        if not forced and random.random() >= config["MEMORY_SAMPLE_RATE"]:
+            return
+        if not self._sampling.acquire(blocking=False):
+            return
+        g._memory_before = self._snapshot()
+        g._memory_start = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+
+    def _header_allowed(self):
+        value = request.headers.get(self.app.config["MEMORY_HEADER"])
+        if value is None:
+            return False
+        if self.app.debug:
+            return True
+        secret = self.app.config.get("MEMORY_SECRET")
+        return bool(secret) and hmac.compare_digest(value.encode(), secret.encode())
+
+    def _teardown(self, exc):
+        before = g.pop("_memory_before", None)
+        if before is None:
+            return
+        try:
+            start = g.pop("_memory_start")
+            peak = tracemalloc.get_traced_memory()[1] - start
+            # Release the session now (Flask-SQLAlchemy would a moment later)
+            # so its identity map is not counted as retained
+            self.db.session.remove()
+            diff = self._snapshot().compare_to(before, "lineno")
+            retained = sum(stat.size_diff for stat in diff)
+            growth = [stat for stat in diff if stat.size_diff > 0]
+            self.record(request.endpoint or "unknown", peak, retained, growth)
+        finally:
+            self._sampling.release()
+
+    def record(self, endpoint, peak, retained, growth):
+        config = self.app.config
+        with self._lock:
+            route = self.routes.setdefault(endpoint, RouteMemory())
+            route.samples += 1
+            route.peak_max = max(route.peak_max, peak)
+            route.peak_total += peak
+            route.retained_last = retained
+            route.retained_total += max(retained, 0)
+            for stat in growth[:config["MEMORY_TOP_SITES"]]:
+                route.sites[_site(stat.traceback[0])] += stat.size_diff
+            if retained > config["MEMORY_LEAK_MIN_BYTES"]:
+                route.leak_streak += 1
+            else:
+                route.leak_streak = 0
+            streak = route.leak_streak
+            report = route.as_dict(3) if streak and streak % config["MEMORY_LEAK_STREAK"] == 0 else None
+        if report is not None:
+            sites = ", ".join(f"{site['site']} (+{site['retained_bytes']} B)" for site in report["top_sites"])
+            self.app.logger.warning("%s retained memory on %d sampled requests in a row (%.0f KiB so far); "
+                                    "top sites: %s", endpoint, streak, report["retained_bytes_total"] / 1024, sites)
+
+    def export(self):
+        if not self.app.debug and not self._header_allowed():
+            abort(404)
+        with self._lock:
+            routes = {endpoint: route.as_dict(self.app.config["MEMORY_TOP_SITES"])
+                      for endpoint, route in sorted(self.routes.items())}
+        current, peak = tracemalloc.get_traced_memory()
+        return jsonify({"traced_bytes": current, "traced_peak_bytes": peak, "routes": routes})
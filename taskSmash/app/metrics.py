@@ -0,0 +1,179 @@
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import request, g, Response
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implied
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _merge_into(totals, buffer):
+    """Add every series in buffer onto the matching series in totals."""
+    for key, series in list(buffer.items()):
+        total = totals.setdefault(key, [0] * len(series))
+        for i, value in enumerate(series):
+            total[i] += value
+
+
+class Metrics:
+    """Per-endpoint request counts and latency histograms.
+
+    Every thread records into its own dict, so the request path never takes
+    a lock; /metrics merges the per-thread buffers when it is scraped.  With
+    METRICS_MULTIPROCESS_DIR set, each worker also dumps its totals to a
+    JSON file there and /metrics adds up every worker's file.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self._local = threading.local()
+        self._buffers = []  # (thread, buffer) for every thread that has recorded
+        self._retired = {}  # totals folded in from threads that have exited
+        self._lock = threading.Lock()
+        self._flusher = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        if not app.config.get("METRICS_ENABLED"):
+            return
+        app.before_request(self._before)
+        app.after_request(self._after)
+        app.teardown_request(self._teardown)
+        app.add_url_rule("/metrics", "metrics", self.export)
+
+    # -----------------------------
+    # Recording
+    # -----------------------------
+    def _buffer(self):
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            buffer = self._local.buffer = {}
+            with self._lock:
+                # Servers that start a thread per request would otherwise grow this list forever
+                if len(self._buffers) >= 64:
+                    self._retire_dead_threads()
+                self._buffers.append((threading.current_thread(), buffer))
+        return buffer
+
+    def _retire_dead_threads(self):
+        alive = []
+        for thread, buffer in self._buffers:
+            if thread.is_alive():
+                alive.append((thread, buffer))
+            else:
+                _merge_into(self._retired, buffer)
+        self._buffers = alive
+
+    def observe(self, endpoint, method, status, seconds):
+        buffer = self._buffer()
+        series = buffer.get((endpoint, method, status))
+        if series is None:
+            # [count, sum, bucket counts..., +Inf bucket]
+            series = buffer[(endpoint, method, status)] = [0, 0.0] + [0] * (len(BUCKETS) + 1)
+        series[0] += 1
+        series[1] += seconds
+        series[2 + bisect_left(BUCKETS, seconds)] += 1
+
+    def _before(self):
+        g._metrics_start = time.perf_counter()
+        self._ensure_flusher()
+
+    def _after(self, response):
+        g._metrics_status = response.status_code
+        return response
+
+    def _teardown(self, exc):
+        # Teardown runs after a streamed response finishes, so the dashboard's
+        # time includes rendering
+        start = g.pop("_metrics_start", None)
+        if start is None:
+            return
+        status = g.pop("_metrics_status", 500)
+        self.observe(request.endpoint or "unknown", request.method, status, time.perf_counter() - start)
+
+    # -----------------------------
+    # Export
+    # -----------------------------
+    def snapshot(self):
+        """Merge every thread's buffer into {key: series}."""
+        with self._lock:
+            self._retire_dead_threads()
+            merged = {}
+            _merge_into(merged, self._retired)
+            buffers = [buffer for _, buffer in self._buffers]
+        for buffer in buffers:
+            _merge_into(merged, buffer)
+        return merged
+
+    def _store_dir(self):
+        return self.app.config.get("METRICS_MULTIPROCESS_DIR")
+
+    def flush(self):
+        """Write this worker's totals to the shared directory."""
+        path = os.path.join(self._store_dir(), f"metrics-{os.getpid()}.json")
+        data = [[list(key), series] for key, series in self.snapshot().items()]
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    def _ensure_flusher(self):
+        if not self._store_dir() or (self._flusher is not None and self._flusher.is_alive()):
+            return
+        with self._lock:
+            if self._flusher is None or not self._flusher.is_alive():
+                os.makedirs(self._store_dir(), exist_ok=True)
+                self._flusher = threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True)
+                self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.app.config.get("METRICS_FLUSH_SECONDS", 5))
+            self.flush()
+
+    def collect(self):
+        if not self._store_dir():
+            return self.snapshot()
+        self.flush()
+        merged = {}
+        for path in glob.glob(os.path.join(self._store_dir(), "metrics-*.json")):
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            _merge_into(merged, {tuple(key): series for key, series in data})
+        return merged
+
+    def export(self):
+        """Prometheus text exposition format."""
+        series = sorted(self.collect().items())
+        lines = [
+            "# HELP tasksmash_http_requests_total Requests handled, by endpoint, method and status.",
+            "# TYPE tasksmash_http_requests_total counter",
+        ]
+        for (endpoint, method, status), values in series:
+            lines.append(f'tasksmash_http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {values[0]}')
+
+        # Latency is reported per endpoint and method, across all statuses
+        latency = {}
+        for (endpoint, method, _), values in series:
+            _merge_into(latency, {(endpoint, method): values})
+        lines += [
+            "# HELP tasksmash_http_request_duration_seconds Request latency.",
+            "# TYPE tasksmash_http_request_duration_seconds histogram",
+        ]
+        for (endpoint, method), values in sorted(latency.items()):
+            labels = f'endpoint="{endpoint}",method="{method}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ("+Inf",), values[2:]):
+                cumulative += count
+                lines.append(f'tasksmash_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"tasksmash_http_request_duration_seconds_sum{{{labels}}} {values[1]}")
+            lines.append(f"tasksmash_http_request_duration_seconds_count{{{labels}}} {values[0]}")
+        return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
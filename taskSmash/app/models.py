@@ -24,22 +24,40 @@ class User(db.Model, UserMixin):
 class Todo(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.String(200), nullable=False)
+    # Rich-text HTML rendered once from content on write (see app/rich_text.py)
+    content_html = db.Column(db.Text, nullable=True)
+    content_render_version = db.Column(db.Integer, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # Set when a task is soft-deleted; the sweeper removes the row and its comments later
+    deleted_at = db.Column(db.DateTime, nullable=True)
+    due_at = db.Column(db.DateTime, nullable=True)
+    priority = db.Column(db.Integer, nullable=False, default=2, server_default="2")  # see PRIORITIES
 
     # Relationship with comments
         # Relationship with Comment using back_populates
     comments = db.relationship('Comment', back_populates='task', cascade="all, delete-orphan")
 
+    # Agenda views page through these with keyset ranges (see read_models.agenda_tasks)
+    __table_args__ = (
+        db.Index('ix_todo_user_due', 'user_id', 'due_at', 'id'),
+        db.Index('ix_todo_user_priority_due', 'user_id', 'priority', 'due_at', 'id'),
+    )
+
+# Most urgent first, so ascending priority is the agenda's sort order
+PRIORITIES = {1: "High", 2: "Normal", 3: "Low"}
+
 # Comment Model
 class Comment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.String(500), nullable=False)
+    content_html = db.Column(db.Text, nullable=True)
+    content_render_version = db.Column(db.Integer, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Foreign keys to the user and the task
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    task_id = db.Column(db.Integer, db.ForeignKey('todo.id'), nullable=False)
+    task_id = db.Column(db.Integer, db.ForeignKey('todo.id'), nullable=False, index=True)
     
     # Self-referential foreign key for nested comments (replies)
     parent_id = db.Column(db.Integer, db.ForeignKey('comment.id'), nullable=True)
@@ -50,6 +68,24 @@ class Comment(db.Model):
     # Relationship to access replies: a comment can have many child comments
     replies = db.relationship('Comment', backref=db.backref('parent', remote_side=[id]), lazy='dynamic')
 
+# Tag Models
+class Tag(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), unique=True, nullable=False)  # lower-case, without the '#'
+    # Live tasks carrying the tag, kept up to date by app/tags.py for the tag cloud
+    task_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (db.Index('ix_tag_task_count', 'task_count'),)
+
+
+class TodoTag(db.Model):
+    # The primary key is the inverted index (tag -> tasks, in id order);
+    # ix_todo_tag_todo goes the other way for a task's own tags
+    tag_id = db.Column(db.Integer, db.ForeignKey('tag.id'), primary_key=True)
+    todo_id = db.Column(db.Integer, db.ForeignKey('todo.id'), primary_key=True)
+
+    __table_args__ = (db.Index('ix_todo_tag_todo', 'todo_id', 'tag_id'),)
+
 # Followers Model
 class Follow(db.Model):
     follower_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
@@ -57,4 +93,67 @@ class Follow(db.Model):
     
     # Relationships
     follower = db.relationship('User', foreign_keys=[follower_id], backref='followed_users')
-    followee = db.relationship('User', foreign_keys=[followee_id], backref='followers')
\ No newline at end of file
+    followee = db.relationship('User', foreign_keys=[followee_id], backref='followers')
+
+# Notification events waiting to go out in an email digest
+class NotificationEvent(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    recipient_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    actor_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    task_id = db.Column(db.Integer, db.ForeignKey('todo.id'), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # 'comment' or 'reply'
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    recipient = db.relationship('User', foreign_keys=[recipient_id])
+    actor = db.relationship('User', foreign_keys=[actor_id])
+    task = db.relationship('Todo', backref=db.backref('notification_events', cascade="all, delete-orphan"))
+
+    # Pending events are looked up by (sent_at IS NULL, created_at)
+    __table_args__ = (db.Index('ix_notification_event_pending', 'sent_at', 'created_at'),)
+
+
+class InboxItem(db.Model):
+    """In-app notification; rows are only ever appended (see app/inbox.py)."""
+    id = db.Column(db.Integer, primary_key=True)
+    recipient_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    actor_id = db.Column(db.Integer, nullable=False)
+    kind = db.Column(db.SmallInteger, nullable=False)  # see inbox.KINDS
+    task_id = db.Column(db.Integer, nullable=True)  # no FK: items outlive deleted tasks
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # A user's inbox is one range of this index, newest first
+    __table_args__ = (db.Index('ix_inbox_item_recipient', 'recipient_id', 'id'),)
+
+
+class InboxCounter(db.Model):
+    """Unread count per user, updated in the same transaction as each InboxItem."""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    unread = db.Column(db.Integer, nullable=False, default=0)
+    last_read_id = db.Column(db.Integer, nullable=False, default=0)
+
+
+class CacheInvalidation(db.Model):
+    """Change log that keeps every worker's in-process caches in step (see app/invalidation.py)."""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # 'task', 'follow' or 'user'
+    subject_id = db.Column(db.Integer, nullable=False)
+    object_id = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# Bookkeeping for `flask import-legacy` (see app/legacy_import.py)
+class LegacyIdMap(db.Model):
+    """Old id -> new id for every row already imported from a legacy database."""
+    source = db.Column(db.String(500), primary_key=True)
+    table_name = db.Column(db.String(50), primary_key=True)
+    old_id = db.Column(db.Integer, primary_key=True)
+    new_id = db.Column(db.Integer, nullable=False)
+
+
+class LegacyImportCheckpoint(db.Model):
+    """How far each table of each legacy database has been imported."""
+    source = db.Column(db.String(500), primary_key=True)
+    table_name = db.Column(db.String(50), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    rows = db.Column(db.Integer, nullable=False, default=0)
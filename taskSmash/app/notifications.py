@@ -0,0 +1,89 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from app.models import NotificationEvent, User
+from app.mail import send_mailgun_batch
+from app import inbox
+
+
+def record_comment_event(recipient_id, actor_id, task_id, kind):
+    """Queue a comment/reply notification and put it in the recipient's inbox.
+
+    Nothing is emailed until the next digest run.
+    """
+    if recipient_id == actor_id:
+        return  # no notifications for commenting on your own things
+    db.session.add(NotificationEvent(recipient_id=recipient_id, actor_id=actor_id, task_id=task_id, kind=kind))
+    inbox.push(recipient_id, actor_id, inbox.KINDS[kind], task_id)
+    db.session.commit()
+
+
+def build_digest(events):
+    """Turn one recipient's events into the text placed in their digest."""
+    lines = []
+    for event in events:
+        # Replies also reach the parent comment's author, who may not own the task
+        if event.task.user_id == event.recipient_id:
+            action = "commented on your task" if event.kind == "comment" else "replied in a thread on your task"
+        else:
+            action = "replied to your comment on the task"
+        lines.append(f"- {event.actor.username} {action} \"{event.task.content}\"")
+    return "\n".join(lines)
+
+
+def send_pending_digests(now=None):
+    """Send every digest whose window has closed and return how many recipients got one.
+
+    Events are grouped per recipient, and recipients are sent in batches of
+    NOTIFY_BATCH_SIZE using Mailgun recipient variables, so a run makes one
+    API call per batch instead of one per event.
+    """
+    now = now or datetime.utcnow()
+    window = timedelta(minutes=current_app.config["NOTIFY_DIGEST_WINDOW_MINUTES"])
+    batch_size = current_app.config["NOTIFY_BATCH_SIZE"]
+
+    # Recipients whose oldest unsent event is older than the window
+    due = db.session.query(NotificationEvent.recipient_id).filter(
+        NotificationEvent.sent_at.is_(None)
+    ).group_by(NotificationEvent.recipient_id).having(
+        db.func.min(NotificationEvent.created_at) <= now - window
+    ).all()
+    due_ids = [row.recipient_id for row in due]
+
+    sent = 0
+    for start in range(0, len(due_ids), batch_size):
+        chunk = due_ids[start:start + batch_size]
+        events = NotificationEvent.query.filter(
+            NotificationEvent.sent_at.is_(None),
+            NotificationEvent.recipient_id.in_(chunk),
+            NotificationEvent.created_at <= now
+        ).order_by(NotificationEvent.id).all()
+
+        by_recipient = defaultdict(list)
+        for event in events:
+            by_recipient[event.recipient_id].append(event)
+        users = {user.id: user for user in User.query.filter(User.id.in_(by_recipient)).all()}
+
+        recipient_variables = {
+            users[user_id].email: {
+                "username": users[user_id].username,
+                "count": len(user_events),
+                "digest": build_digest(user_events)
+            }
+            for user_id, user_events in by_recipient.items()
+        }
+        response = send_mailgun_batch(
+            recipient_variables,
+            subject="You have %recipient.count% new comment(s) on TaskSmash",
+            body="Hi %recipient.username%,\n\n%recipient.digest%\n"
+        )
+        if not response.ok:
+            # Leave the events unsent so the next run retries this batch
+            continue
+
+        for event in events:
+            event.sent_at = now
+        db.session.commit()
+        sent += len(recipient_variables)
+    return sent
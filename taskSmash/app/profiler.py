@@ -0,0 +1,111 @@
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from flask import request, g
+
+
+class StackSampler:
+    """Sample one thread's call stack on a background thread.
+
+    Stacks are stored in the collapsed "frame;frame;frame count" format that
+    flamegraph.pl, speedscope and inferno read directly.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.items())
+
+
+class RequestProfiler:
+    """Arm a StackSampler for some requests and save the slow ones.
+
+    A request is sampled when it sends the PROFILER_HEADER header, or at
+    random for PROFILER_SAMPLE_RATE of all traffic.  The header is only
+    honored in debug mode or when its value matches PROFILER_SECRET, so
+    anonymous clients cannot make the server profile and write files.  Header requests are
+    always written out; random ones only if they took longer than
+    PROFILER_THRESHOLD_MS.  Output goes to PROFILER_DIR as one
+    .collapsed file per request.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        if not app.config.get("PROFILER_ENABLED"):
+            return
+        app.before_request(self._before)
+        app.teardown_request(self._teardown)
+
+    def _before(self):
+        config = self.app.config
+        forced = self._header_allowed(request.headers.get(config["PROFILER_HEADER"]))
+        if not forced and random.random() >= config["PROFILER_SAMPLE_RATE"]:
+            return
+        g._profiler = StackSampler(threading.get_ident(), 1.0 / config["PROFILER_HZ"])
+        g._profiler_forced = forced
+        g._profiler_start = time.perf_counter()
+        g._profiler.start()
+
+    def _header_allowed(self, value):
+        if value is None:
+            return False
+        if self.app.debug:
+            return True
+        secret = self.app.config.get("PROFILER_SECRET")
+        return bool(secret) and hmac.compare_digest(value.encode(), secret.encode())
+
+    def _teardown(self, exc):
+        sampler = g.pop("_profiler", None)
+        if sampler is None:
+            return
+        sampler.stop()
+        elapsed_ms = (time.perf_counter() - g.pop("_profiler_start")) * 1000
+        if not g.pop("_profiler_forced") and elapsed_ms < self.app.config["PROFILER_THRESHOLD_MS"]:
+            return
+        self.write(sampler, elapsed_ms)
+
+    def write(self, sampler, elapsed_ms):
+        out_dir = self.app.config["PROFILER_DIR"] or os.path.join(self.app.instance_path, "profiles")
+        os.makedirs(out_dir, exist_ok=True)
+        # The random suffix keeps requests finishing in the same second from overwriting each other
+        name = (f"{time.strftime('%Y%m%d-%H%M%S')}-{request.endpoint or 'unknown'}-{int(elapsed_ms)}ms-"
+                f"{uuid.uuid4().hex[:8]}.collapsed")
+        path = os.path.join(out_dir, name)
+        with open(path, "w") as f:
+            f.write(sampler.collapsed())
+        self.app.logger.info("Profile for %s (%.0f ms) written to %s", request.path, elapsed_ms, path)
+        return path
@@ -0,0 +1,217 @@
+from collections import defaultdict
+from sqlalchemy import select, func, tuple_
+from flask import abort
+from app import db
+from app.models import User, Todo, Comment, Follow, PRIORITIES
+
+# Read-only records for pages that only display data.  They are filled from
+# Core select() rows, so nothing is added to the session identity map and no
+# change tracking or relationship loaders are set up.  Attribute names match
+# the models, so templates can use either.
+
+
+class UserRow:
+    __slots__ = ("id", "username")
+
+    def __init__(self, id, username):
+        self.id = id
+        self.username = username
+
+
+class CommentRow:
+    __slots__ = ("id", "content", "content_html", "created_at", "task_id", "parent_id", "user", "replies")
+
+    def __init__(self, id, content, content_html, created_at, task_id, parent_id, user):
+        self.id = id
+        self.content = content
+        self.content_html = content_html
+        self.created_at = created_at
+        self.task_id = task_id
+        self.parent_id = parent_id
+        self.user = user
+        self.replies = []
+
+
+class TaskRow:
+    __slots__ = ("id", "content", "content_html", "created_at", "due_at", "priority", "user_id", "user", "comments",
+                 "comment_count")
+
+    def __init__(self, id, content, content_html, created_at, due_at, priority, user_id, user):
+        self.id = id
+        self.content = content
+        self.content_html = content_html
+        self.created_at = created_at
+        self.due_at = due_at
+        self.priority = priority
+        self.user_id = user_id
+        self.user = user
+        self.comments = []
+        self.comment_count = 0
+
+
+TASK_COLUMNS = (Todo.id, Todo.content, Todo.content_html, Todo.created_at, Todo.due_at, Todo.priority, Todo.user_id,
+                User.username)
+COMMENT_COLUMNS = (Comment.id, Comment.content, Comment.content_html, Comment.created_at, Comment.task_id,
+                   Comment.parent_id, Comment.user_id, User.username)
+
+
+def _task_row(row):
+    return TaskRow(row.id, row.content, row.content_html, row.created_at, row.due_at, row.priority, row.user_id,
+                   UserRow(row.user_id, row.username))
+
+
+def _comment_row(row):
+    return CommentRow(row.id, row.content, row.content_html, row.created_at, row.task_id, row.parent_id,
+                      UserRow(row.user_id, row.username))
+
+
+def comments_for_tasks(task_ids):
+    """Load every comment for the given tasks in one query.
+
+    Returns {task_id: [CommentRow, ...]} with each comment's replies filled
+    in, matching what Todo.comments / Comment.replies give on the models.
+    """
+    by_task = defaultdict(list)
+    if not task_ids:
+        return by_task
+    stmt = (select(*COMMENT_COLUMNS)
+            .join(User, User.id == Comment.user_id)
+            .where(Comment.task_id.in_(task_ids))
+            .order_by(Comment.id))
+    by_id = {}
+    for row in db.session.execute(stmt):
+        comment = _comment_row(row)
+        by_id[comment.id] = comment
+        by_task[comment.task_id].append(comment)
+    for comment in by_id.values():
+        parent = by_id.get(comment.parent_id)
+        if parent is not None:
+            parent.replies.append(comment)
+    return by_task
+
+
+def comment_counts(task_ids):
+    """{task_id: number of comments, replies included} from one GROUP BY query."""
+    if not task_ids:
+        return {}
+    stmt = (select(Comment.task_id, func.count(Comment.id))
+            .where(Comment.task_id.in_(task_ids))
+            .group_by(Comment.task_id))
+    return dict(db.session.execute(stmt).all())
+
+
+def _tasks_with_comment_counts(stmt, chunk_size=100):
+    """Yield TaskRows chunk by chunk with comment_count filled in.
+
+    The threads themselves are not loaded; the dashboard fetches them on
+    demand from the task_thread fragment.
+    """
+    result = db.session.execute(stmt.execution_options(yield_per=chunk_size))
+    for chunk in result.partitions():
+        tasks = [_task_row(row) for row in chunk]
+        counts = comment_counts([task.id for task in tasks])
+        for task in tasks:
+            task.comment_count = counts.get(task.id, 0)
+            yield task
+
+
+# -----------------------------
+# Dashboard
+# -----------------------------
+def user_tasks(user_id, tag_filter=None):
+    """tag_filter is an optional condition from app.tags.tag_filter()."""
+    stmt = (select(*TASK_COLUMNS)
+            .join(User, User.id == Todo.user_id)
+            .where(Todo.user_id == user_id, Todo.deleted_at.is_(None))
+            .order_by(Todo.id))
+    if tag_filter is not None:
+        stmt = stmt.where(tag_filter)
+    return _tasks_with_comment_counts(stmt)
+
+
+def followed_users_tasks(user_id, tag_filter=None):
+    stmt = (select(*TASK_COLUMNS)
+            .join(User, User.id == Todo.user_id)
+            .join(Follow, Follow.followee_id == Todo.user_id)
+            .where(Follow.follower_id == user_id, Todo.deleted_at.is_(None))
+            .order_by(Todo.id))
+    if tag_filter is not None:
+        stmt = stmt.where(tag_filter)
+    return _tasks_with_comment_counts(stmt)
+
+
+def non_followed_users(user_id):
+    followed = select(Follow.followee_id).where(Follow.follower_id == user_id)
+    stmt = (select(User.id, User.username)
+            .where(User.id != user_id, User.id.not_in(followed))
+            .order_by(User.id))
+    for row in db.session.execute(stmt.execution_options(yield_per=100)):
+        yield UserRow(row.id, row.username)
+
+
+def users_by_ids(user_ids):
+    """UserRows for user_ids (e.g. from the follow graph), in id order."""
+    if not user_ids:
+        return []
+    stmt = select(User.id, User.username).where(User.id.in_(user_ids)).order_by(User.id)
+    return [UserRow(row.id, row.username) for row in db.session.execute(stmt)]
+
+
+# -----------------------------
+# Single Task
+# -----------------------------
+def task_or_404(task_id):
+    stmt = (select(*TASK_COLUMNS)
+            .join(User, User.id == Todo.user_id)
+            .where(Todo.id == task_id, Todo.deleted_at.is_(None)))
+    row = db.session.execute(stmt).first()
+    if row is None:
+        abort(404)
+    return _task_row(row)
+
+
+def task_comments(task_id):
+    """All comments on a task (replies included) in posting order."""
+    return comments_for_tasks([task_id]).get(task_id, [])
+
+
+# -----------------------------
+# Agenda
+# -----------------------------
+def agenda_tasks(user_id, start, end, after=None, by_priority=False, limit=50):
+    """One page of a user's live tasks due in [start, end), plus the cursor for the next page.
+
+    start may be None for an open-ended range.  Pages are keyset ranges on
+    (due_at, id), or (priority, due_at, id) with by_priority, which
+    ix_todo_user_due / ix_todo_user_priority_due answer as index range scans
+    however many tasks the user has.  after is the cursor returned with the
+    previous page.
+    """
+    def page(stmt, cursor, limit):
+        stmt = stmt.where(Todo.due_at < end, Todo.deleted_at.is_(None))
+        if start is not None:
+            stmt = stmt.where(Todo.due_at >= start)
+        if cursor is not None:
+            stmt = stmt.where(tuple_(Todo.due_at, Todo.id) > tuple_(*cursor))
+        return [_task_row(row) for row in db.session.execute(stmt.order_by(Todo.due_at, Todo.id).limit(limit))]
+
+    base = select(*TASK_COLUMNS).join(User, User.id == Todo.user_id).where(Todo.user_id == user_id)
+    if not by_priority:
+        tasks = page(base, after, limit + 1)
+    else:
+        # One range scan per priority level, in order, instead of a sort over every matching task
+        tasks = []
+        for priority in sorted(PRIORITIES):
+            if after is not None and priority < after[0]:
+                continue
+            cursor = after[1:] if after is not None and priority == after[0] else None
+            tasks += page(base.where(Todo.priority == priority), cursor, limit + 1 - len(tasks))
+            if len(tasks) > limit:
+                break
+
+    next_cursor = None
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        last = tasks[-1]
+        next_cursor = (last.priority, last.due_at, last.id) if by_priority else (last.due_at, last.id)
+    return tasks, next_cursor
@@ -0,0 +1,82 @@
+import re
+from markupsafe import escape
+
+# Bump whenever render() output changes; `flask rerender-rich-text` then
+# rebuilds every stored body whose version is older.
+RENDERER_VERSION = 3
+
+# A small Markdown subset: **bold**, *italic* / _italic_, `code`,
+# [text](https://link), bare http(s) links, @mentions and paragraphs.
+# The source is HTML-escaped before any markup is added, so the only tags
+# in the output are the ones produced here.
+_CODE = re.compile(r"`([^`\n]+)`")
+# Stash placeholders are delimited by private-use characters (see _marker).
+# URLs must never take one in, or a parked fragment would be restored
+# inside an href attribute.  (Link text may hold code placeholders: it is
+# element content.)
+_PRIVATE_USE = "\ue000-\uf8ff"
+_LINK = re.compile(rf"\[([^\]\n]+)\]\((https?://[^\s){_PRIVATE_USE}]+)\)")
+_URL = re.compile(rf"\bhttps?://[^\s<{_PRIVATE_USE}]+[^\s<.,;:!?){_PRIVATE_USE}]")
+# What an href may hold once escaped: no whitespace, quotes, tags or placeholders
+_SAFE_HREF = re.compile(rf"https?://[^\s\"'<>{_PRIVATE_USE}]+")
+_MENTION = re.compile(r"(?<![\w@/])@(\w{2,50})")
+_BOLD = re.compile(r"\*\*(?=\S)(.+?)(?<=\S)\*\*")
+_ITALIC = re.compile(r"(?<![\w*])([*_])(?=\S)(.+?)(?<=\S)\1(?![\w*])")
+# An emphasis marker left inside a bold span once its own italics are done
+_STRAY_MARKER = re.compile(r"\*|(?<!\w)_|_(?!\w)")
+
+
+def _marker(text):
+    """A private-use character that does not occur in text, to delimit stash placeholders."""
+    for code in range(0xE000, 0xF900):
+        if chr(code) not in text:
+            return chr(code)
+    raise ValueError("no free placeholder character")
+
+
+def render(source):
+    """Return sanitized HTML for a task or comment body."""
+    text = str(escape(source or ""))
+    marker = _marker(text)
+    placeholder = re.compile(f"{marker}(\\d+){marker}")
+    stash = []
+
+    def keep(html):
+        # Finished fragments are parked so later patterns cannot touch them
+        stash.append(html)
+        return f"{marker}{len(stash) - 1}{marker}"
+
+    def bold(m):
+        inner = _ITALIC.sub(r"<em>\2</em>", m.group(1))
+        if _STRAY_MARKER.search(inner):
+            # Emphasis overlapping the bold span (**a *b** c*) is left as typed
+            # rather than producing <strong>a <em>b</strong> c</em>
+            return keep(m.group(0))
+        return keep(f"<strong>{inner}</strong>")
+
+    def link(href, label):
+        if not _SAFE_HREF.fullmatch(href):
+            return None
+        return keep(f'<a href="{href}" rel="nofollow noopener">{label}</a>')
+
+    text = _CODE.sub(lambda m: keep(f"<code>{m.group(1)}</code>"), text)
+    text = _LINK.sub(lambda m: link(m.group(2), m.group(1)) or m.group(0), text)
+    text = _URL.sub(lambda m: link(m.group(0), m.group(0)) or m.group(0), text)
+    text = _MENTION.sub(lambda m: keep(f'<span class="mention">@{m.group(1)}</span>'), text)
+    text = _BOLD.sub(bold, text)
+    text = _ITALIC.sub(r"<em>\2</em>", text)
+
+    # Output is inline (templates put it inside <strong>/<p>), so paragraphs
+    # become blank-line breaks rather than <p> tags
+    paragraphs = [p.strip() for p in re.split(r"\n\s*\n", text.replace("\r\n", "\n")) if p.strip()]
+    html = "<br><br>".join(p.replace("\n", "<br>") for p in paragraphs)
+
+    def restore(m):
+        # Bold fragments hold placeholders of their own (code, links, ...)
+        return placeholder.sub(restore, stash[int(m.group(1))])
+    return placeholder.sub(restore, html)
+
+
+def rendered_fields(source):
+    """Column values to store next to a body whenever it is written."""
+    return {"content_html": render(source), "content_render_version": RENDERER_VERSION}
@@ -1,12 +1,95 @@
-from flask import render_template, request, redirect, url_for, flash, session, current_app
-from app import app, db
-from app.models import User, Todo, Comment, Follow
+from flask import render_template, stream_template, request, redirect, url_for, flash, session, current_app, abort, jsonify
+from app import app, db, group_committer, task_sweeper, availability_index, thread_cache, invalidation_bus, \
+    follow_graph
+from app.invalidation import TASK, USER
+from app.models import User, Todo, Comment, PRIORITIES
 from app.mail import send_mailgun_email
+from app.notifications import record_comment_event
+from app.task_delete import delete_tasks, soft_delete_task
+from app import read_models
+from app.follows import follow_many, unfollow_many
+from app.rich_text import rendered_fields
+from app.tags import extract_tags, set_task_tags, tag_filter, tag_cloud
+from app import inbox
+from markupsafe import Markup, escape
 from flask_login import login_user, login_required, current_user, logout_user
 import jwt
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.exc import IntegrityError
 from app.forms import LoginForm, RegisterForm, EditTaskForm
 
+# -----------------------------
+# Insert Helper
+# -----------------------------
+def insert_row(model, **values):
+    """Insert a row and return its id, going through group commit when enabled."""
+    if group_committer.enabled:
+        return group_committer.insert(model, **values)
+    row = model(**values)
+    db.session.add(row)
+    db.session.commit()
+    return row.id
+
+@app.template_filter("rich")
+def rich_text_filter(item):
+    """Stored rich-text HTML for a task/comment, or its escaped source if never rendered."""
+    if item.content_html is not None:
+        return Markup(item.content_html)
+    return escape(item.content)
+
+
+app.add_template_global(PRIORITIES, "PRIORITIES")
+
+
+# due_at is stored as naive UTC, like created_at.  datetime-local inputs hold
+# the browser's local time, so base.html keeps the browser's offset (minutes
+# behind UTC, as JS getTimezoneOffset() reports it) in the tz_offset cookie.
+MAX_TZ_OFFSET = 14 * 60
+
+
+def client_tz_offset():
+    try:
+        offset = int(request.cookies.get("tz_offset", 0))
+    except ValueError:
+        return 0
+    return offset if abs(offset) <= MAX_TZ_OFFSET else 0
+
+
+def utc_now():
+    """The current UTC time, naive like the stored timestamps."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def local_to_utc(value):
+    return value + timedelta(minutes=client_tz_offset()) if value is not None else None
+
+
+def utc_to_local(value):
+    return value - timedelta(minutes=client_tz_offset()) if value is not None else None
+
+
+@app.template_filter("local_time")
+def local_time_filter(value):
+    return utc_to_local(value).strftime("%Y-%m-%d %H:%M")
+
+
+def parse_task_schedule(form):
+    """due_at (converted to UTC) and priority from the add-task form; bad values are a 400."""
+    try:
+        due = form.get("due_at")
+        due_at = local_to_utc(datetime.fromisoformat(due)) if due else None
+        priority = int(form.get("priority") or 2)
+    except ValueError:
+        abort(400)
+    if priority not in PRIORITIES:
+        abort(400)
+    return {"due_at": due_at, "priority": priority}
+
+
+def get_live_task_or_404(task_id):
+    """Like Todo.query.get_or_404 but treats soft-deleted tasks as missing."""
+    return Todo.query.filter_by(id=task_id, deleted_at=None).first_or_404()
+
 # -----------------------------
 # Password Reset Routes
 # -----------------------------
@@ -50,6 +133,7 @@ def reset_password(token):
         new_password = request.form.get("password")
         user.set_password(new_password)
         db.session.commit()
+        invalidation_bus.publish(USER, user.id)
         flash("Your password has been reset successfully!")
         return redirect(url_for("landing_page"))
     return render_template("resetPassword.html", token=token)
@@ -61,23 +145,34 @@ def reset_password(token):
 @login_required
 def add_todo():
     content = request.form.get("content")
-    new_todo = Todo(content=content, user_id=current_user.id)
-    db.session.add(new_todo)
-    db.session.commit()
+    task_id = insert_row(Todo, content=content, user_id=current_user.id, **parse_task_schedule(request.form),
+                         **rendered_fields(content))
+    tags = extract_tags(content)
+    if tags:
+        set_task_tags(task_id, tags)
+        db.session.commit()
     return redirect(url_for("dashboard"))
 
 
 @app.route("/edit/<int:id>", methods=["GET", "POST"])
 @login_required
 def edit_todo(id):
-    task = Todo.query.get_or_404(id)
+    task = get_live_task_or_404(id)
     if task.user_id != current_user.id:
         flash("You do not have permission to edit this to-do.", "error")
         return redirect(url_for("dashboard"))
     form = EditTaskForm(obj=task)
+    if request.method == "GET":
+        form.due_at.data = utc_to_local(task.due_at)
     if form.validate_on_submit():
         task.content = form.content.data
+        task.due_at = local_to_utc(form.due_at.data)
+        task.priority = form.priority.data
+        for field, value in rendered_fields(task.content).items():
+            setattr(task, field, value)
+        set_task_tags(task.id, extract_tags(task.content))
         db.session.commit()
+        invalidation_bus.publish(TASK, task.id)
         return redirect(url_for("dashboard"))
     return render_template("edit.html", task=task, form=form)
 
@@ -85,14 +180,70 @@ def edit_todo(id):
 @app.route("/delete/<int:id>", methods=["POST"])
 @login_required
 def delete_todo(id):
-    todo = Todo.query.get_or_404(id)
+    todo = get_live_task_or_404(id)
     if todo.user_id != current_user.id:
         flash("You do not have permission to delete this to-do.", "error")
         return redirect(url_for("dashboard"))
-    db.session.delete(todo)
-    db.session.commit()
+    if current_app.config["TASK_SOFT_DELETE"]:
+        soft_delete_task(todo.id)
+        task_sweeper.wake()
+    else:
+        delete_tasks([todo.id])
+    invalidation_bus.publish(TASK, todo.id)
     return redirect(url_for("dashboard"))
 
+# -----------------------------
+# Agenda Routes
+# -----------------------------
+AGENDA_TITLES = {"overdue": "Overdue", "today": "Due Today", "week": "Due This Week"}
+
+
+def agenda_window(view, now, tz_offset=0):
+    """[start, end) of due times for an agenda view; start None means open-ended.
+
+    now and the bounds are naive UTC; days start at midnight for a client
+    tz_offset minutes behind UTC.
+    """
+    shift = timedelta(minutes=tz_offset)
+    today = (now - shift).replace(hour=0, minute=0, second=0, microsecond=0) + shift
+    if view == "overdue":
+        return None, now
+    if view == "today":
+        return now, today + timedelta(days=1)
+    return now, today + timedelta(days=7)
+
+
+def parse_agenda_cursor(value, by_priority):
+    """Inverse of format_agenda_cursor; a malformed cursor is a 400."""
+    if not value:
+        return None
+    try:
+        parts = value.split(",")
+        if by_priority:
+            priority, due, task_id = parts
+            return int(priority), datetime.fromisoformat(due), int(task_id)
+        due, task_id = parts
+        return datetime.fromisoformat(due), int(task_id)
+    except ValueError:
+        abort(400)
+
+
+def format_agenda_cursor(cursor):
+    if cursor is None:
+        return None
+    return ",".join(value.isoformat() if isinstance(value, datetime) else str(value) for value in cursor)
+
+
+@app.route("/agenda/<any(overdue, today, week):view>")
+@login_required
+def agenda(view):
+    by_priority = request.args.get("sort") == "priority"
+    start, end = agenda_window(view, utc_now(), client_tz_offset())
+    after = parse_agenda_cursor(request.args.get("after"), by_priority)
+    tasks, next_cursor = read_models.agenda_tasks(current_user.id, start, end, after=after, by_priority=by_priority)
+    return render_template("agenda.html", view=view, title=AGENDA_TITLES[view], tasks=tasks,
+                           sort="priority" if by_priority else None, next_cursor=format_agenda_cursor(next_cursor))
+
 # -----------------------------
 # Comment Routes
 # -----------------------------
@@ -100,19 +251,36 @@ def delete_todo(id):
 @login_required
 def add_comment(task_id):
     content = request.form.get("comment")
-    new_comment = Comment(content=content, task_id=task_id, user_id=current_user.id)
-    db.session.add(new_comment)
-    db.session.commit()
+    task_owner_id = db.session.query(Todo.user_id).filter_by(id=task_id, deleted_at=None).scalar()
+    if task_owner_id is None:
+        abort(404)
+    insert_row(Comment, content=content, task_id=task_id, user_id=current_user.id, **rendered_fields(content))
+    invalidation_bus.publish(TASK, task_id)
+    record_comment_event(task_owner_id, current_user.id, task_id, "comment")
     return redirect(url_for("dashboard"))
 
 
 @app.route("/task/<int:task_id>")
 @login_required
 def view_task(task_id):
-    task = Todo.query.get_or_404(task_id)
-    comments = Comment.query.filter_by(task_id=task_id).all()
+    task = read_models.task_or_404(task_id)
+    comments = read_models.task_comments(task_id)
     return render_template("task.html", task=task, comments=comments)
 
+
+@app.route("/task/<int:task_id>/thread")
+@login_required
+def task_thread(task_id):
+    """Rendered comment thread for one task, fetched when it is expanded on the dashboard."""
+    html = thread_cache.get(task_id)
+    if html is None:
+        # Taken before reading, so a comment committed while rendering is not cached away
+        generation = thread_cache.generation(task_id)
+        read_models.task_or_404(task_id)
+        html = render_template("commentThread.html", comments=read_models.task_comments(task_id))
+        thread_cache.set(task_id, html, generation)
+    return html
+
 # -----------------------------
 # Home, Login & Register Routes
 # -----------------------------
@@ -164,28 +332,41 @@ def register():
         email = form.email.data
         password = form.password.data
 
-        existing_user_by_username = User.query.filter_by(username=username).first()
-        existing_user_by_email = User.query.filter_by(email=email).first()
-
-        if existing_user_by_username or existing_user_by_email:
+        # Single insert; the unique constraints on username/email catch duplicates
+        new_user = User(username=username, email=email)
+        new_user.set_password(password)
+        db.session.add(new_user)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
             flash("Username or email already exists.", "error")
             return redirect(url_for("register", keep_flash=1))
-        else:
-            new_user = User(username=username, email=email)
-            new_user.set_password(password)
-            db.session.add(new_user)
-            db.session.commit()
+        invalidation_bus.publish(USER, new_user.id)
 
-            flash("Account created successfully!", "success")
-            return redirect(url_for("login"))
+        flash("Account created successfully!", "success")
+        return redirect(url_for("login"))
 
     return render_template("register.html", form=form)
 
+
+@app.route("/register/check")
+def check_availability():
+    """Live check used by the register form: /register/check?username=... or ?email=..."""
+    for field in ("username", "email"):
+        value = request.args.get(field)
+        if value:
+            return jsonify({"field": field, "available": availability_index.is_available(field, value)})
+    abort(400)
+
 # -----------------------------
 # Miscellaneous Routes
 # -----------------------------
 @app.after_request
 def add_header(response):
+    # Static files keep their own caching headers (fingerprinted assets are immutable)
+    if request.endpoint in ("static", "asset"):
+        return response
     response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
     response.headers["Pragma"] = "no-cache"
     response.headers["Expires"] = "0"
@@ -205,18 +386,24 @@ def logout():
 @login_required
 def add_comment_reply(comment_id):
     parent_comment = Comment.query.get_or_404(comment_id)
+    if parent_comment.task.deleted_at is not None:
+        abort(404)
     reply_content = request.form.get("reply")
     if not reply_content:
         flash("Reply cannot be empty.", "error")
         return redirect(url_for("dashboard"))
-    reply = Comment(
+    insert_row(
+        Comment,
         content=reply_content,
         user_id=current_user.id,
         task_id=parent_comment.task_id,
-        parent_id=parent_comment.id
+        parent_id=parent_comment.id,
+        **rendered_fields(reply_content)
     )
-    db.session.add(reply)
-    db.session.commit()
+    invalidation_bus.publish(TASK, parent_comment.task_id)
+    # Tell the task owner and the person being replied to (once each)
+    for recipient_id in {parent_comment.task.user_id, parent_comment.user_id}:
+        record_comment_event(recipient_id, current_user.id, parent_comment.task_id, "reply")
     flash("Your reply has been added.", "success")
     return redirect(url_for("dashboard"))
 
@@ -226,46 +413,101 @@ def add_comment_reply(comment_id):
 @app.route("/follow/<int:user_id>", methods=["POST"])
 @login_required
 def follow_user(user_id):
-    user_to_follow = User.query.get_or_404(user_id)
-    existing_follow = Follow.query.filter_by(follower_id=current_user.id, followee_id=user_id).first()
-    if not existing_follow:
-        follow = Follow(follower_id=current_user.id, followee_id=user_id)
-        db.session.add(follow)
-        db.session.commit()
-        flash(f"You are now following {user_to_follow.username}!", "success")
+    username = db.session.query(User.username).filter_by(id=user_id).scalar()
+    if username is None:
+        abort(404)
+    if user_id == current_user.id:
+        flash("You cannot follow yourself.", "info")
+    elif follow_graph.is_following(current_user.id, user_id):
+        # Answered from the in-memory graph, so a repeated click costs no write
+        flash(f"You are already following {username}.", "info")
+    elif follow_many(current_user.id, [user_id]):
+        flash(f"You are now following {username}!", "success")
     else:
-        flash(f"You are already following {user_to_follow.username}.", "info")
+        flash(f"You are already following {username}.", "info")
     return redirect(url_for("dashboard"))
 
 
 @app.route("/unfollow/<int:user_id>", methods=["POST"])
 @login_required
 def unfollow_user(user_id):
-    follow = Follow.query.filter_by(follower_id=current_user.id, followee_id=user_id).first()
-    if follow:
-        db.session.delete(follow)
-        db.session.commit()
+    if unfollow_many(current_user.id, [user_id]):
         flash("You have unfollowed the user.", "success")
     else:
         flash("You were not following this user.", "info")
     return redirect(url_for("dashboard"))
 
+
+def bulk_user_ids():
+    """User ids from a JSON body ({"user_ids": [...]}) or repeated user_ids form fields."""
+    data = request.get_json(silent=True)
+    user_ids = data.get("user_ids", []) if data else request.form.getlist("user_ids")
+    try:
+        return [int(user_id) for user_id in user_ids]
+    except (TypeError, ValueError):
+        abort(400)
+
+
+@app.route("/follow/bulk", methods=["POST"])
+@login_required
+def follow_bulk():
+    followed = follow_many(current_user.id, bulk_user_ids())
+    if request.is_json:
+        return jsonify({"followed": followed})
+    flash(f"You are now following {len(followed)} more user(s).", "success")
+    return redirect(url_for("dashboard"))
+
+
+@app.route("/unfollow/bulk", methods=["POST"])
+@login_required
+def unfollow_bulk():
+    unfollowed = unfollow_many(current_user.id, bulk_user_ids())
+    if request.is_json:
+        return jsonify({"unfollowed": unfollowed})
+    flash(f"You have unfollowed {len(unfollowed)} user(s).", "success")
+    return redirect(url_for("dashboard"))
+
+# -----------------------------
+# Inbox Routes
+# -----------------------------
+app.add_template_global(inbox.unread_count, "unread_count")
+
+
+@app.route("/inbox")
+@login_required
+def inbox_view():
+    before = request.args.get("before", type=int)
+    items = inbox.inbox_page(current_user.id, before=before)
+    # Opening the inbox reads everything up to the newest item shown
+    last_read_id = inbox.mark_read(current_user.id, items[0].id) if items and before is None else None
+    return render_template("inbox.html", items=items, kinds=inbox.KINDS,
+                           last_read_id=last_read_id,
+                           next_before=items[-1].id if len(items) == inbox.PAGE_SIZE else None)
+
 # -----------------------------
 # Dashboard Route
 # -----------------------------
 @app.route("/dashboard")
 @login_required
 def dashboard():
+    # Streamed so the header and the user's own tasks reach the browser right
+    # away; the followed feed and suggestions queries only run (and flush) as
+    # the template gets to them.  The tag cloud and mutual follows are passed
+    # as callables for the same reason.  The lists are lightweight read-only
+    # rows from app.read_models rather than ORM objects.
+    # ?tag=a&tag=b narrows both task lists; match=any switches from AND to OR
     user_id = current_user.id
-    tasks = Todo.query.filter_by(user_id=user_id).all()
-    followed_users_tasks = Todo.query.join(Follow, Follow.followee_id == Todo.user_id).filter(Follow.follower_id == user_id).all()
-    non_followed_users = User.query.filter(User.id != user_id).filter(
-        ~User.id.in_(db.session.query(Follow.followee_id).filter(Follow.follower_id == user_id))
-    ).all()
-    return render_template("dashboard.html",
-                           tasks=tasks,
-                           followed_users_tasks=followed_users_tasks,
-                           non_followed_users=non_followed_users)
+    tags = request.args.getlist("tag")
+    match_all = request.args.get("match") != "any"
+    condition = tag_filter(tags, match_all) if tags else None
+    return stream_template("dashboard.html",
+                           tags=tags,
+                           match_all=match_all,
+                           tag_cloud=tag_cloud,
+                           tasks=read_models.user_tasks(user_id, condition),
+                           followed_users_tasks=read_models.followed_users_tasks(user_id, condition),
+                           mutual_follows=lambda: read_models.users_by_ids(follow_graph.mutual_follows(user_id)),
+                           non_followed_users=read_models.non_followed_users(user_id))
 
 # -----------------------------
 # About Route
@@ -0,0 +1,61 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError
+from app import db
+
+# Columns added after the first release.  db.create_all() only creates
+# missing tables (and their indexes), so databases made by an older version
+# get these through ALTER TABLE from `flask db-upgrade` (run.py runs it too).
+ADDED_COLUMNS = {
+    "todo": [
+        ("deleted_at", "DATETIME"),
+        ("content_html", "TEXT"),
+        ("content_render_version", "INTEGER"),
+        ("due_at", "DATETIME"),
+        ("priority", "INTEGER NOT NULL DEFAULT 2"),
+    ],
+    "comment": [
+        ("content_html", "TEXT"),
+        ("content_render_version", "INTEGER"),
+    ],
+}
+
+
+def upgrade_database():
+    """Create missing tables, then add missing columns and indexes. Safe to run repeatedly."""
+    db.create_all()
+    upgrade_schema()
+
+
+def _already_exists(error):
+    message = str(error.orig).lower()
+    return "duplicate column" in message or "already exists" in message
+
+
+def upgrade_schema():
+    """Add any columns from ADDED_COLUMNS and any model indexes the database does not have yet.
+
+    Each change is its own transaction and one that another process made
+    first ("duplicate column" / "already exists") is skipped, so workers
+    starting together do not trip over each other.
+    """
+    inspector = inspect(db.engine)
+    statements = []
+    for table, columns in ADDED_COLUMNS.items():
+        existing = {column["name"] for column in inspector.get_columns(table)}
+        statements += [text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}")
+                       for name, ddl in columns if name not in existing]
+    for statement in statements:
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(statement)
+        except OperationalError as e:
+            if not _already_exists(e):
+                raise
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                with db.engine.begin() as conn:
+                    index.create(bind=conn, checkfirst=True)
+            except OperationalError as e:
+                if not _already_exists(e):
+                    raise
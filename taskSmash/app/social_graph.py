@@ -0,0 +1,293 @@
+import threading
+from array import array
+from bisect import bisect_left, insort
+
+
+def intersect_sorted(a, b):
+    """Intersect two sorted integer sequences without building sets."""
+    if len(a) > len(b):
+        a, b = b, a
+    if not a:
+        return []
+    # Much smaller list: binary search each item into the bigger one
+    if len(a) * 8 < len(b):
+        out = []
+        lo = 0
+        for x in a:
+            lo = bisect_left(b, x, lo)
+            if lo == len(b):
+                break
+            if b[lo] == x:
+                out.append(x)
+        return out
+    # Similar sizes: a single linear merge
+    out = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        if a[i] == b[j]:
+            out.append(a[i])
+            i += 1
+            j += 1
+        elif a[i] < b[j]:
+            i += 1
+        else:
+            j += 1
+    return out
+
+
+class Adjacency:
+    """One direction of the follow graph stored CSR style.
+
+    The neighbours of node n are targets[offsets[n]:offsets[n + 1]], kept
+    sorted.  Edges added or removed after the last build live in small
+    per-node overlays and are folded back in by compact().
+    """
+
+    def __init__(self):
+        self.offsets = array('q', [0])
+        self.targets = array('i')
+        self.added = {}    # node -> sorted array('i') of extra neighbours
+        self.removed = {}  # node -> set of deleted neighbours
+        self.pending = 0
+
+    def build(self, pairs):
+        """Rebuild from (node, neighbour) pairs in any order."""
+        pairs = sorted(set(pairs))
+        size = (pairs[-1][0] + 2) if pairs else 1
+        counts = array('q', bytes(8 * size))
+        for node, _ in pairs:
+            counts[node + 1] += 1
+        for n in range(1, size):
+            counts[n] += counts[n - 1]
+        self.offsets = counts
+        self.targets = array('i', (neighbour for _, neighbour in pairs))
+        self.added = {}
+        self.removed = {}
+        self.pending = 0
+
+    def build_sorted(self, pairs):
+        """Rebuild from distinct (node, neighbour) pairs already sorted, one at a time.
+
+        Nothing but the two arrays is kept, so pairs can be a streamed query.
+        """
+        offsets = array('q', [0])
+        targets = array('i')
+        for node, neighbour in pairs:
+            # Close every node before this one; offsets[node] is where it starts
+            while len(offsets) <= node:
+                offsets.append(len(targets))
+            targets.append(neighbour)
+        if targets:
+            offsets.append(len(targets))
+        self.offsets = offsets
+        self.targets = targets
+        self.added = {}
+        self.removed = {}
+        self.pending = 0
+
+    def build_reversed(self, other):
+        """Rebuild as the other direction of a freshly built Adjacency (no overlays).
+
+        A counting sort over its arrays: nodes are visited in order, so each
+        reversed neighbour list comes out sorted.
+        """
+        size = (max(other.targets) + 2) if other.targets else 1
+        offsets = array('q', bytes(8 * size))
+        for neighbour in other.targets:
+            offsets[neighbour + 1] += 1
+        for n in range(1, size):
+            offsets[n] += offsets[n - 1]
+        fill = array('q', offsets)
+        targets = array('i', bytes(4 * len(other.targets)))
+        for node in range(len(other.offsets) - 1):
+            for i in range(other.offsets[node], other.offsets[node + 1]):
+                neighbour = other.targets[i]
+                targets[fill[neighbour]] = node
+                fill[neighbour] += 1
+        self.offsets = offsets
+        self.targets = targets
+        self.added = {}
+        self.removed = {}
+        self.pending = 0
+
+    def _base(self, node):
+        if node + 1 >= len(self.offsets):
+            return 0, 0
+        return self.offsets[node], self.offsets[node + 1]
+
+    def contains(self, node, neighbour):
+        if neighbour in self.removed.get(node, ()):
+            return False
+        extra = self.added.get(node)
+        if extra:
+            i = bisect_left(extra, neighbour)
+            if i < len(extra) and extra[i] == neighbour:
+                return True
+        lo, hi = self._base(node)
+        i = bisect_left(self.targets, neighbour, lo, hi)
+        return i < hi and self.targets[i] == neighbour
+
+    def neighbours(self, node):
+        lo, hi = self._base(node)
+        base = self.targets[lo:hi]
+        removed = self.removed.get(node)
+        if removed:
+            base = array('i', (n for n in base if n not in removed))
+        extra = self.added.get(node)
+        if not extra:
+            return base
+        return array('i', sorted(base + extra))
+
+    def add(self, node, neighbour):
+        removed = self.removed.get(node)
+        if removed and neighbour in removed:
+            removed.discard(neighbour)
+            return True
+        if self.contains(node, neighbour):
+            return False
+        insort(self.added.setdefault(node, array('i')), neighbour)
+        self.pending += 1
+        return True
+
+    def discard(self, node, neighbour):
+        extra = self.added.get(node)
+        if extra:
+            i = bisect_left(extra, neighbour)
+            if i < len(extra) and extra[i] == neighbour:
+                del extra[i]
+                return True
+        if not self.contains(node, neighbour):
+            return False
+        self.removed.setdefault(node, set()).add(neighbour)
+        self.pending += 1
+        return True
+
+    def edges(self):
+        for node in range(len(self.offsets) - 1):
+            for neighbour in self.targets[self.offsets[node]:self.offsets[node + 1]]:
+                if neighbour not in self.removed.get(node, ()):
+                    yield node, neighbour
+        for node, extra in self.added.items():
+            for neighbour in extra:
+                yield node, neighbour
+
+    def compact(self):
+        self.build(list(self.edges()))
+
+    def nbytes(self):
+        overlay = sum(a.itemsize * len(a) for a in self.added.values())
+        overlay += sum(len(s) for s in self.removed.values()) * 8
+        return self.offsets.itemsize * len(self.offsets) + self.targets.itemsize * len(self.targets) + overlay
+
+
+class FollowGraph:
+    """In-process copy of the Follow table for fast membership and set queries.
+
+    Loaded from the database on first use and kept current through follow
+    invalidation events (see app/invalidation.py), which re-read the changed
+    edge.  The Follow table stays the source of truth.
+    """
+
+    def __init__(self, compact_after=10000):
+        self.following = Adjacency()  # follower -> followees
+        self.followed_by = Adjacency()  # followee -> followers
+        self.compact_after = compact_after
+        self.loaded = False
+        self._lock = threading.RLock()
+
+    def load(self, edges):
+        """Build the graph from (follower_id, followee_id) pairs."""
+        edges = list(edges)
+        with self._lock:
+            self.following.build(edges)
+            self.followed_by.build((b, a) for a, b in edges)
+            self.loaded = True
+
+    def load_from_db(self, batch_size=10000):
+        """Build the graph straight from the Follow table without a list of rows.
+
+        Rows are fetched batch_size at a time in primary key order, which is
+        the order following needs; followed_by is derived from its arrays.
+        """
+        from app import db
+        from app.models import Follow
+        rows = db.session.execute(
+            db.select(Follow.follower_id, Follow.followee_id)
+            .order_by(Follow.follower_id, Follow.followee_id)
+            .execution_options(yield_per=batch_size)
+        )
+        with self._lock:
+            self.following.build_sorted(rows)
+            self.followed_by.build_reversed(self.following)
+            self.loaded = True
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            with self._lock:
+                if not self.loaded:
+                    self.load_from_db()
+
+    def add(self, follower_id, followee_id):
+        with self._lock:
+            if self.following.add(follower_id, followee_id):
+                self.followed_by.add(followee_id, follower_id)
+            self._maybe_compact()
+
+    def remove(self, follower_id, followee_id):
+        with self._lock:
+            if self.following.discard(follower_id, followee_id):
+                self.followed_by.discard(followee_id, follower_id)
+            self._maybe_compact()
+
+    def refresh_edge(self, follower_id, followee_id):
+        """Re-read one edge from the Follow table after another worker changed it."""
+        if not self.loaded:
+            return
+        from app import db
+        from app.models import Follow
+        if db.session.get(Follow, (follower_id, followee_id)) is None:
+            self.remove(follower_id, followee_id)
+        else:
+            self.add(follower_id, followee_id)
+
+    def reset(self):
+        """Forget the graph; it is reloaded on next use."""
+        with self._lock:
+            self.loaded = False
+
+    def _maybe_compact(self):
+        if self.following.pending + self.followed_by.pending >= self.compact_after:
+            self.following.compact()
+            self.followed_by.compact()
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+    def is_following(self, follower_id, followee_id):
+        self.ensure_loaded()
+        with self._lock:
+            return self.following.contains(follower_id, followee_id)
+
+    def followees(self, user_id):
+        self.ensure_loaded()
+        with self._lock:
+            return list(self.following.neighbours(user_id))
+
+    def followers(self, user_id):
+        self.ensure_loaded()
+        with self._lock:
+            return list(self.followed_by.neighbours(user_id))
+
+    def mutual_follows(self, user_id):
+        """Users that user_id follows and who follow them back."""
+        self.ensure_loaded()
+        with self._lock:
+            return intersect_sorted(self.following.neighbours(user_id), self.followed_by.neighbours(user_id))
+
+    def common_followees(self, a, b):
+        self.ensure_loaded()
+        with self._lock:
+            return intersect_sorted(self.following.neighbours(a), self.following.neighbours(b))
+
+    def nbytes(self):
+        return self.following.nbytes() + self.followed_by.nbytes()
@@ -0,0 +1,13 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+
+
+def dialect_insert(table):
+    """INSERT that supports .on_conflict_do_nothing() / .on_conflict_do_update().
+
+    The upsert clauses are spelled the same on both backends but live in
+    the dialect packages.
+    """
+    if db.engine.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
@@ -0,0 +1,90 @@
+import re
+from sqlalchemy import select, func, false, intersect, union, bindparam
+from app import db
+from app.sql_compat import dialect_insert
+from app.models import Tag, TodoTag, Todo
+
+# A #hashtag in task content; not part of a word, URL fragment or HTML entity
+TAG_PATTERN = re.compile(r"(?<![\w#&/])#(\w{1,50})")
+
+
+def extract_tags(content):
+    """Lower-case tag names found in content, sorted and without duplicates."""
+    return sorted({name.lower() for name in TAG_PATTERN.findall(content or "")})
+
+
+def set_task_tags(task_id, names):
+    """Make the task's tags exactly names, adjusting each tag's task_count by the difference.
+
+    Only the changed associations are written, and the counters are updated
+    in the same transaction.  The caller commits.
+    """
+    names = set(names)
+    current = dict(db.session.execute(
+        select(Tag.name, Tag.id).join(TodoTag, TodoTag.tag_id == Tag.id).where(TodoTag.todo_id == task_id)
+    ).all())
+
+    removed = [tag_id for name, tag_id in current.items() if name not in names]
+    if removed:
+        db.session.execute(db.delete(TodoTag).where(TodoTag.todo_id == task_id, TodoTag.tag_id.in_(removed)))
+        db.session.execute(db.update(Tag).where(Tag.id.in_(removed)).values(task_count=Tag.task_count - 1))
+
+    added = names - current.keys()
+    if added:
+        db.session.execute(dialect_insert(Tag).on_conflict_do_nothing(index_elements=["name"]),
+                           [{"name": name, "task_count": 0} for name in added])
+        added_ids = list(db.session.execute(select(Tag.id).where(Tag.name.in_(added))).scalars())
+        db.session.execute(db.insert(TodoTag), [{"tag_id": tag_id, "todo_id": task_id} for tag_id in added_ids])
+        db.session.execute(db.update(Tag).where(Tag.id.in_(added_ids)).values(task_count=Tag.task_count + 1))
+
+
+def remove_task_tags(task_ids):
+    """Drop every tag from the given tasks (deleted ones) and decrement the counters. The caller commits."""
+    task_ids = list(task_ids)
+    if not task_ids:
+        return
+    counts = db.session.execute(
+        select(TodoTag.tag_id, func.count()).where(TodoTag.todo_id.in_(task_ids)).group_by(TodoTag.tag_id)
+    ).all()
+    if not counts:
+        return
+    db.session.execute(
+        db.update(Tag.__table__).where(Tag.__table__.c.id == bindparam("tag_id"))
+        .values(task_count=Tag.__table__.c.task_count - bindparam("removed")),
+        [{"tag_id": tag_id, "removed": count} for tag_id, count in counts]
+    )
+    db.session.execute(db.delete(TodoTag).where(TodoTag.todo_id.in_(task_ids)))
+
+
+# -----------------------------
+# Filtering
+# -----------------------------
+def tag_ids(names):
+    if not names:
+        return []
+    return list(db.session.execute(select(Tag.id).where(Tag.name.in_(names))).scalars())
+
+
+def tag_filter(names, match_all=True):
+    """A condition on Todo.id for tasks tagged with all (or any) of names.
+
+    Each tag's posting list is a range of the todo_tag primary key, already
+    in todo_id order, and SQLite combines them with INTERSECT / UNION inside
+    one IN (...) subquery, so no task row is read to decide membership.
+    """
+    names = {name.lower().lstrip("#") for name in names}
+    ids = tag_ids(names)
+    if not ids or (match_all and len(ids) < len(names)):
+        return false()
+    postings = [select(TodoTag.todo_id).where(TodoTag.tag_id == tag_id) for tag_id in ids]
+    if len(postings) == 1:
+        return Todo.id.in_(postings[0])
+    combine = intersect if match_all else union
+    return Todo.id.in_(combine(*postings))
+
+
+def tag_cloud(limit=30):
+    """(name, task_count) of the most used tags, busiest first, from ix_tag_task_count."""
+    return db.session.execute(
+        select(Tag.name, Tag.task_count).where(Tag.task_count > 0).order_by(Tag.task_count.desc()).limit(limit)
+    ).all()
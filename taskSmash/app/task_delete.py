@@ -0,0 +1,84 @@
+import threading
+from datetime import datetime
+from app import db
+from app.models import Todo, Comment, NotificationEvent
+from app.tags import remove_task_tags
+
+
+def delete_tasks(task_ids):
+    """Delete tasks and everything hanging off them with set-based statements.
+
+    Replies carry the same task_id as the comment they answer, so one
+    DELETE ... WHERE task_id IN (...) removes whole threads without loading
+    a single Comment into the session.
+    """
+    task_ids = list(task_ids)
+    if not task_ids:
+        return
+    remove_task_tags(task_ids)
+    db.session.execute(db.delete(NotificationEvent).where(NotificationEvent.task_id.in_(task_ids)))
+    db.session.execute(db.delete(Comment).where(Comment.task_id.in_(task_ids)))
+    db.session.execute(db.delete(Todo).where(Todo.id.in_(task_ids)))
+    db.session.commit()
+
+
+def soft_delete_task(task_id):
+    """Hide a task right away and leave its rows for the sweeper."""
+    db.session.execute(db.update(Todo).where(Todo.id == task_id).values(deleted_at=datetime.utcnow()))
+    # Hidden tasks leave the tag counts and filters straight away
+    remove_task_tags([task_id])
+    db.session.commit()
+
+
+def sweep_deleted_tasks(chunk_size=500, max_chunks=None):
+    """Reclaim soft-deleted tasks a chunk of comments at a time.
+
+    Each chunk is its own short transaction so a huge thread never holds the
+    write lock for long.  Returns the number of comment rows removed.
+    """
+    removed = 0
+    chunks = 0
+    while max_chunks is None or chunks < max_chunks:
+        task_id = db.session.query(Todo.id).filter(Todo.deleted_at.isnot(None)).limit(1).scalar()
+        if task_id is None:
+            break
+        chunk = db.session.query(Comment.id).filter(Comment.task_id == task_id).limit(chunk_size)
+        result = db.session.execute(db.delete(Comment).where(Comment.id.in_(chunk.scalar_subquery())))
+        db.session.commit()
+        chunks += 1
+        removed += result.rowcount
+        if result.rowcount < chunk_size:
+            # Thread is empty now, drop the task itself
+            delete_tasks([task_id])
+    return removed
+
+
+class TaskSweeper:
+    """Background thread that runs sweep_deleted_tasks() after soft deletes."""
+
+    def __init__(self, app=None, chunk_size=500):
+        self.app = app
+        self.chunk_size = app.config.get("TASK_SWEEP_CHUNK_SIZE", chunk_size) if app else chunk_size
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def wake(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="task-sweeper", daemon=True)
+                    self._thread.start()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            with self.app.app_context():
+                try:
+                    sweep_deleted_tasks(self.chunk_size)
+                except Exception:
+                    self.app.logger.exception("Task sweeper failed; soft-deleted tasks stay hidden until the next sweep")
+                finally:
+                    db.session.remove()
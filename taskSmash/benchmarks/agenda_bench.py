@@ -0,0 +1,78 @@
+"""Agenda page latency as one user's task count grows to 100k.
+
+Run from the taskSmash folder:  python benchmarks/agenda_bench.py
+Seeds a throwaway SQLite file, then times the first and a deep page of
+each agenda view, sorted by due date and by priority, at several task
+counts.  With the (user_id, due_at) and (user_id, priority, due_at)
+indexes the times should stay flat; a full scan would grow linearly.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+DB_DIR = tempfile.mkdtemp()
+os.environ["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + os.path.join(DB_DIR, "bench.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db, read_models  # noqa: E402
+from app.models import User, Todo, PRIORITIES  # noqa: E402
+from app.routes import agenda_window, utc_now  # noqa: E402
+
+TASK_COUNTS = (1_000, 10_000, 100_000)
+OTHER_USERS = 20  # share the table with the user being measured
+REQUESTS = 50
+PAGES_DEEP = 10
+
+
+def seed(tasks_per_user, now):
+    rng = random.Random(295)
+    db.drop_all()
+    db.create_all()
+    db.session.execute(db.insert(User), [
+        {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "password_hash": "x"}
+        for i in range(1, OTHER_USERS + 2)
+    ])
+    # Due dates spread over a year either side of now, so every view has work
+    for user_id in range(1, OTHER_USERS + 2):
+        count = tasks_per_user if user_id == 1 else tasks_per_user // 10
+        db.session.execute(db.insert(Todo), [
+            {"content": f"task {t}", "user_id": user_id, "priority": rng.choice(list(PRIORITIES)),
+             "due_at": now + timedelta(minutes=rng.randrange(-525_600, 525_600))}
+            for t in range(count)
+        ])
+    db.session.commit()
+
+
+def time_view(view, by_priority, now):
+    start, end = agenda_window(view, now)
+    began = time.perf_counter()
+    for _ in range(REQUESTS):
+        read_models.agenda_tasks(1, start, end, by_priority=by_priority)
+    first = (time.perf_counter() - began) / REQUESTS
+
+    after = None
+    for _ in range(PAGES_DEEP):
+        _, after = read_models.agenda_tasks(1, start, end, after=after, by_priority=by_priority)
+        if after is None:
+            break
+    began = time.perf_counter()
+    for _ in range(REQUESTS):
+        read_models.agenda_tasks(1, start, end, after=after, by_priority=by_priority)
+    deep = (time.perf_counter() - began) / REQUESTS
+    return first, deep
+
+
+if __name__ == "__main__":
+    now = utc_now()
+    print(f"{'tasks':>8} {'view':>8} {'sort':>9} {'page 1 ms':>10} {'page ' + str(PAGES_DEEP + 1) + ' ms':>11}")
+    with app.app_context():
+        for count in TASK_COUNTS:
+            seed(count, now)
+            for view in ("overdue", "today", "week"):
+                for by_priority in (False, True):
+                    first, deep = time_view(view, by_priority, now)
+                    sort = "priority" if by_priority else "due"
+                    print(f"{count:>8,} {view:>8} {sort:>9} {first * 1000:>10.2f} {deep * 1000:>11.2f}")
@@ -0,0 +1,104 @@
+"""Memory and lookup speed of FollowGraph at one million follow edges.
+
+Run from the taskSmash folder:  python benchmarks/follow_graph_bench.py
+Edges are generated randomly.  Each build reports its time, the memory
+still held afterwards and the peak allocated while building; the
+load_from_db row also seeds a throwaway SQLite file with the same edges.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+DB_DIR = tempfile.mkdtemp()
+os.environ["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + os.path.join(DB_DIR, "bench.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db  # noqa: E402
+from app.models import Follow  # noqa: E402
+from app.social_graph import FollowGraph  # noqa: E402
+
+USERS = 50_000
+EDGES = 1_000_000
+LOOKUPS = 200_000
+
+
+def random_edges():
+    rng = random.Random(295)
+    edges = set()
+    while len(edges) < EDGES:
+        a, b = rng.randrange(1, USERS), rng.randrange(1, USERS)
+        if a != b:
+            edges.add((a, b))
+    return list(edges)
+
+
+def measure(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    graph = build()
+    elapsed = time.perf_counter() - start
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return graph, size, peak, elapsed
+
+
+def build_graph(edges):
+    graph = FollowGraph()
+    graph.load(edges)
+    return graph
+
+
+def seed(edges):
+    db.create_all()
+    db.session.execute(db.insert(Follow), [{"follower_id": a, "followee_id": b} for a, b in edges])
+    db.session.commit()
+
+
+def build_graph_from_db():
+    graph = FollowGraph()
+    graph.load_from_db()
+    return graph
+
+
+def build_dict_of_sets(edges):
+    following, followed_by = defaultdict(set), defaultdict(set)
+    for a, b in edges:
+        following[a].add(b)
+        followed_by[b].add(a)
+    return following, followed_by
+
+
+def report(name, size, peak, elapsed):
+    print(f"{name:<28} {size / 2**20:8.1f} MiB held, {peak / 2**20:8.1f} MiB peak, built in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    edges = random_edges()
+    print(f"{EDGES:,} edges between {USERS:,} users")
+    graph, *stats = measure(lambda: build_graph(edges))
+    report("FollowGraph.load (list)", *stats)
+    _, *stats = measure(lambda: build_dict_of_sets(edges))
+    report("dict of sets", *stats)
+
+    with app.app_context():
+        seed(edges)
+        del edges
+        db.session.expunge_all()
+        _, *stats = measure(build_graph_from_db)
+        report("FollowGraph.load_from_db", *stats)
+
+    rng = random.Random(1)
+    pairs = [(rng.randrange(1, USERS), rng.randrange(1, USERS)) for _ in range(LOOKUPS)]
+    start = time.perf_counter()
+    for a, b in pairs:
+        graph.is_following(a, b)
+    print(f"is_following: {LOOKUPS / (time.perf_counter() - start):,.0f} lookups/s")
+
+    start = time.perf_counter()
+    for user_id in range(1, 10_001):
+        graph.mutual_follows(user_id)
+    print(f"mutual_follows: {10_000 / (time.perf_counter() - start):,.0f} users/s")
@@ -0,0 +1,65 @@
+"""Compare comment inserts/sec with and without group commit.
+
+Run from the taskSmash folder:  python benchmarks/group_commit_bench.py
+A throwaway SQLite file is used so instance/user.db is never touched.
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+DB_DIR = tempfile.mkdtemp()
+os.environ["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + os.path.join(DB_DIR, "bench.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db, group_committer  # noqa: E402
+from app.models import User, Todo, Comment  # noqa: E402
+
+INSERTS_PER_THREAD = 200
+CONCURRENCY_LEVELS = [1, 4, 16, 64]
+
+
+def setup():
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        user = User(username="bench", email="bench@example.com", password_hash="x")
+        db.session.add(user)
+        db.session.commit()
+        todo = Todo(content="bench task", user_id=user.id)
+        db.session.add(todo)
+        db.session.commit()
+        return user.id, todo.id
+
+
+def direct_insert(user_id, task_id):
+    with app.app_context():
+        for i in range(INSERTS_PER_THREAD):
+            db.session.add(Comment(content=f"comment {i}", user_id=user_id, task_id=task_id))
+            db.session.commit()
+
+
+def grouped_insert(user_id, task_id):
+    for i in range(INSERTS_PER_THREAD):
+        group_committer.insert(Comment, content=f"comment {i}", user_id=user_id, task_id=task_id)
+
+
+def run(worker, threads):
+    user_id, task_id = setup()
+    pool = [threading.Thread(target=worker, args=(user_id, task_id)) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return threads * INSERTS_PER_THREAD / elapsed
+
+
+if __name__ == "__main__":
+    print(f"{'threads':>8} {'direct/s':>12} {'grouped/s':>12} {'speedup':>8}")
+    for threads in CONCURRENCY_LEVELS:
+        direct = run(direct_insert, threads)
+        grouped = run(grouped_insert, threads)
+        print(f"{threads:>8} {direct:>12.0f} {grouped:>12.0f} {grouped / direct:>7.1f}x")
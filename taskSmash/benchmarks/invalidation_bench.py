@@ -0,0 +1,106 @@
+"""Check that separate worker processes converge after writes in another worker.
+
+Run from the taskSmash folder:  python benchmarks/invalidation_bench.py
+Starts WORKERS processes on one throwaway SQLite file.  Each warms its
+comment-thread cache and follow graph, then one worker comments and
+follows while the others keep serving requests until their caches show
+the change.  Reports how long each worker took to converge.
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Set in the environment so spawned workers open the parent's file
+DB_PATH = os.environ.setdefault("INVALIDATION_BENCH_DB", os.path.join(tempfile.mkdtemp(), "bench.db"))
+WORKERS = 4
+POLL_INTERVAL = "0.2"
+TIMEOUT = 10
+MARKER = "fresh comment from the writer"
+
+
+def load_app():
+    os.environ["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + DB_PATH
+    os.environ["INVALIDATION_POLL_INTERVAL"] = POLL_INTERVAL
+    sys.path.insert(0, ROOT)
+    from app import app
+    app.config["WTF_CSRF_ENABLED"] = False
+    return app
+
+
+def seed():
+    app = load_app()
+    from app import db
+    from app.models import User, Todo
+    with app.app_context():
+        db.create_all()
+        for name in ("alice", "bob"):
+            user = User(username=name, email=f"{name}@example.com")
+            user.set_password("secret1")
+            db.session.add(user)
+        db.session.commit()
+        db.session.add(Todo(content="shared task", user_id=2))
+        db.session.commit()
+
+
+def worker(index, ready, go, results):
+    app = load_app()
+    from app import follow_graph
+    client = app.test_client()
+    client.post("/login", data={"username": "alice", "password": "secret1"})
+    # Warm the caches this worker would otherwise serve stale
+    client.get("/task/1/thread")
+    with app.app_context():
+        follow_graph.ensure_loaded()
+    ready.wait()
+
+    if index == 0:
+        client.post("/comment/1", data={"comment": MARKER})
+        client.post("/follow/2")
+        go.set()
+        results.put((index, 0.0))
+        return
+
+    go.wait()
+    start = time.perf_counter()
+    while time.perf_counter() - start < TIMEOUT:
+        thread_html = client.get("/task/1/thread").get_data(as_text=True)
+        with app.app_context():
+            following = follow_graph.is_following(1, 2)
+        if MARKER in thread_html and following:
+            results.put((index, time.perf_counter() - start))
+            return
+        time.sleep(0.01)
+    results.put((index, None))
+
+
+def main():
+    seed()
+    ctx = multiprocessing.get_context("spawn")
+    ready = ctx.Barrier(WORKERS)
+    go = ctx.Event()
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(i, ready, go, results)) for i in range(WORKERS)]
+    for proc in procs:
+        proc.start()
+    outcomes = sorted(results.get(timeout=TIMEOUT * 3) for _ in procs)
+    for proc in procs:
+        proc.join()
+
+    print(f"{WORKERS} workers, poll interval {POLL_INTERVAL}s")
+    failed = False
+    for index, elapsed in outcomes:
+        if index == 0:
+            print("  worker 0: wrote the comment and follow")
+        elif elapsed is None:
+            print(f"  worker {index}: still stale after {TIMEOUT}s")
+            failed = True
+        else:
+            print(f"  worker {index}: converged in {elapsed * 1000:.0f} ms")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Compare the ORM read path with app.read_models for the dashboard.
+
+Run from the taskSmash folder:  python benchmarks/read_path_bench.py
+Seeds a throwaway SQLite file, then renders dashboard.html for one user
+both ways and reports latency and peak allocated memory per request.
+Both paths fill in the same fields (comment_count included) and must
+render identical HTML, which is checked before timing.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+DB_DIR = tempfile.mkdtemp()
+os.environ["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + os.path.join(DB_DIR, "bench.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import render_template  # noqa: E402
+from flask_login import login_user  # noqa: E402
+from sqlalchemy.orm import joinedload  # noqa: E402
+from app import app, db, read_models  # noqa: E402
+from app.models import User, Todo, Comment, Follow  # noqa: E402
+
+USERS = 200
+TASKS_PER_USER = 50
+COMMENTS_PER_TASK = 4
+FOLLOWS_PER_USER = 10
+REQUESTS = 5
+
+
+def seed():
+    rng = random.Random(295)
+    db.drop_all()
+    db.create_all()
+    db.session.execute(db.insert(User), [
+        {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "password_hash": "x"}
+        for i in range(1, USERS + 1)
+    ])
+    db.session.execute(db.insert(Todo), [
+        {"content": f"task {t} of user {u}", "user_id": u}
+        for u in range(1, USERS + 1) for t in range(TASKS_PER_USER)
+    ])
+    task_count = USERS * TASKS_PER_USER
+    comments = []
+    for task_id in range(1, task_count + 1):
+        for c in range(COMMENTS_PER_TASK):
+            # every other comment is a reply to the first comment on the task
+            parent = len(comments) - c + 1 if c % 2 else None
+            comments.append({"content": f"comment {c}", "user_id": rng.randrange(1, USERS + 1),
+                             "task_id": task_id, "parent_id": parent})
+    db.session.execute(db.insert(Comment), comments)
+    db.session.execute(db.insert(Follow), [
+        {"follower_id": 1, "followee_id": f} for f in rng.sample(range(2, USERS + 1), FOLLOWS_PER_USER)
+    ])
+    db.session.commit()
+
+
+def with_comment_counts(tasks):
+    # The dashboard shows a count per task and fetches threads on demand
+    counts = read_models.comment_counts([task.id for task in tasks])
+    for task in tasks:
+        task.comment_count = counts.get(task.id, 0)
+    return tasks
+
+
+def orm_context(user_id):
+    return dict(
+        tasks=with_comment_counts(
+            Todo.query.filter_by(user_id=user_id, deleted_at=None).order_by(Todo.id).all()),
+        followed_users_tasks=with_comment_counts(
+            Todo.query.options(joinedload(Todo.user)).join(Follow, Follow.followee_id == Todo.user_id)
+            .filter(Follow.follower_id == user_id, Todo.deleted_at.is_(None)).order_by(Todo.id).all()),
+        non_followed_users=User.query.filter(User.id != user_id).filter(
+            ~User.id.in_(db.session.query(Follow.followee_id).filter(Follow.follower_id == user_id))
+        ).order_by(User.id).all(),
+    )
+
+
+def rows_context(user_id):
+    return dict(
+        tasks=read_models.user_tasks(user_id),
+        followed_users_tasks=read_models.followed_users_tasks(user_id),
+        non_followed_users=read_models.non_followed_users(user_id),
+    )
+
+
+def render(build_context):
+    # Tag filtering and mutual follows are the same for both paths, so left empty
+    html = render_template("dashboard.html", tags=[], match_all=True, tag_cloud=lambda: [], mutual_follows=lambda: [],
+                           **build_context(1))
+    db.session.remove()
+    return html
+
+
+def measure(build_context):
+    render(build_context)  # warm up
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        render(build_context)
+    latency = (time.perf_counter() - start) / REQUESTS
+
+    tracemalloc.start()
+    render(build_context)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return latency, peak
+
+
+if __name__ == "__main__":
+    with app.app_context():
+        seed()
+    with app.test_request_context():
+        login_user(db.session.get(User, 1))
+        print(f"{USERS} users, {USERS * TASKS_PER_USER:,} tasks, "
+              f"{USERS * TASKS_PER_USER * COMMENTS_PER_TASK:,} comments")
+        assert render(orm_context) == render(rows_context), "the two paths render different pages"
+        print(f"{'path':>6} {'ms/request':>11} {'peak KiB':>10}")
+        for name, build_context in (("orm", orm_context), ("rows", rows_context)):
+            latency, peak = measure(build_context)
+            print(f"{name:>6} {latency * 1000:>11.1f} {peak / 1024:>10.0f}")
@@ -9,4 +9,75 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     MAILGUN_DOMAIN = os.getenv("MAILGUN_DOMAIN")
     MAILGUN_API_KEY = os.getenv("MAILGUN_API_KEY")
-    SENDER_EMAIL = os.getenv("SENDER_EMAIL")
\ No newline at end of file
+    SENDER_EMAIL = os.getenv("SENDER_EMAIL")
+    MAILGUN_API_BASE = os.getenv("MAILGUN_API_BASE", "https://api.mailgun.net/v3")
+
+    # Group commit: coalesce small inserts (comments, replies, tasks) into one transaction
+    GROUP_COMMIT_ENABLED = os.getenv("GROUP_COMMIT_ENABLED", "false").lower() == "true"
+    GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", 64))
+    GROUP_COMMIT_MAX_DELAY_MS = float(os.getenv("GROUP_COMMIT_MAX_DELAY_MS", 5))
+    # How long insert() waits for the writer before committing the row itself
+    GROUP_COMMIT_TIMEOUT_MS = float(os.getenv("GROUP_COMMIT_TIMEOUT_MS", 5000))
+
+    # Comment notification digests
+    NOTIFY_DIGEST_WINDOW_MINUTES = int(os.getenv("NOTIFY_DIGEST_WINDOW_MINUTES", 15))
+    NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", 1000))  # Mailgun's per-call recipient limit
+
+    # Task deletion: soft delete hides a task at once and a background sweeper
+    # removes its comment thread in chunks
+    TASK_SOFT_DELETE = os.getenv("TASK_SOFT_DELETE", "false").lower() == "true"
+    TASK_SWEEP_CHUNK_SIZE = int(os.getenv("TASK_SWEEP_CHUNK_SIZE", 500))
+
+    # Sampling profiler: writes collapsed stacks (for flame graphs) of slow requests
+    PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "false").lower() == "true"
+    PROFILER_HEADER = os.getenv("PROFILER_HEADER", "X-Profile")  # send this header to always profile a request
+    PROFILER_SECRET = os.getenv("PROFILER_SECRET")  # required header value outside debug mode; unset = header ignored
+    PROFILER_SAMPLE_RATE = float(os.getenv("PROFILER_SAMPLE_RATE", 0.01))  # share of other requests that get sampled
+    PROFILER_THRESHOLD_MS = float(os.getenv("PROFILER_THRESHOLD_MS", 500))  # only keep sampled requests slower than this
+    PROFILER_HZ = float(os.getenv("PROFILER_HZ", 200))
+    PROFILER_DIR = os.getenv("PROFILER_DIR")  # defaults to instance/profiles
+
+    # Prometheus metrics on /metrics
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_MULTIPROCESS_DIR = os.getenv("METRICS_MULTIPROCESS_DIR")  # set to add up all workers' metrics
+    METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", 5))
+
+    # Bloom filters behind the live username / email availability check
+    AVAILABILITY_BLOOM_CAPACITY = int(os.getenv("AVAILABILITY_BLOOM_CAPACITY", 100000))
+    AVAILABILITY_BLOOM_ERROR_RATE = float(os.getenv("AVAILABILITY_BLOOM_ERROR_RATE", 0.01))
+
+    # Cache of rendered comment-thread fragments for the dashboard
+    THREAD_CACHE_MAX_ENTRIES = int(os.getenv("THREAD_CACHE_MAX_ENTRIES", 1000))
+    THREAD_CACHE_TTL = float(os.getenv("THREAD_CACHE_TTL", 60))  # seconds
+
+    # Output folder of `flask build-assets`; defaults to app/static/dist
+    ASSETS_DIR = os.getenv("ASSETS_DIR")
+
+    # Cross-worker cache invalidation: writes append to a change log that each
+    # worker polls (at most once per interval, before a request) by sequence number
+    INVALIDATION_ENABLED = os.getenv("INVALIDATION_ENABLED", "true").lower() == "true"
+    INVALIDATION_POLL_INTERVAL = float(os.getenv("INVALIDATION_POLL_INTERVAL", 0.5))  # seconds
+    INVALIDATION_RETAIN = int(os.getenv("INVALIDATION_RETAIN", 10000))  # newest events kept in the log
+
+    # Admission control: per-route concurrency limits with short wait queues;
+    # requests that cannot get a slot in time get a 503 with Retry-After
+    ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+    ADMISSION_HASH_LIMIT = int(os.getenv("ADMISSION_HASH_LIMIT", 4))  # login/register/reset_password POSTs
+    ADMISSION_DASHBOARD_LIMIT = int(os.getenv("ADMISSION_DASHBOARD_LIMIT", 16))  # dashboard, task pages, threads
+    ADMISSION_QUEUE_FACTOR = int(os.getenv("ADMISSION_QUEUE_FACTOR", 4))  # waiting requests allowed per slot
+    ADMISSION_MAX_WAIT_MS = float(os.getenv("ADMISSION_MAX_WAIT_MS", 1000))
+    # Limits shrink while requests run slower than these and grow back when faster
+    ADMISSION_HASH_TARGET_MS = float(os.getenv("ADMISSION_HASH_TARGET_MS", 500))
+    ADMISSION_DASHBOARD_TARGET_MS = float(os.getenv("ADMISSION_DASHBOARD_TARGET_MS", 300))
+
+    # Memory tracking: tracemalloc snapshots around sampled requests, reported
+    # per endpoint on /debug/memory.  Tracing slows every allocation, so opt-in.
+    MEMORY_TRACKING_ENABLED = os.getenv("MEMORY_TRACKING_ENABLED", "false").lower() == "true"
+    MEMORY_HEADER = os.getenv("MEMORY_HEADER", "X-Memory")  # send this header to always sample a request
+    MEMORY_SECRET = os.getenv("MEMORY_SECRET")  # required header value outside debug mode (also for /debug/memory)
+    MEMORY_SAMPLE_RATE = float(os.getenv("MEMORY_SAMPLE_RATE", 0.05))
+    MEMORY_TRACE_FRAMES = int(os.getenv("MEMORY_TRACE_FRAMES", 1))  # stack depth stored per allocation
+    MEMORY_TOP_SITES = int(os.getenv("MEMORY_TOP_SITES", 10))
+    # Warn when a route keeps at least this much on this many sampled requests in a row
+    MEMORY_LEAK_MIN_BYTES = int(os.getenv("MEMORY_LEAK_MIN_BYTES", 64 * 1024))
+    MEMORY_LEAK_STREAK = int(os.getenv("MEMORY_LEAK_STREAK", 5))
@@ -1,8 +1,9 @@
-from app import app, db
+from app import app, follow_graph
+from app.schema import upgrade_database
 
 if __name__ == '__main__':
-    # Initialize the database 
+    # Same as `flask db-upgrade`; under `flask run` or a WSGI server run that once per deploy
     with app.app_context():
-         # db.drop_all()  # Drop all tables (for development purposes only)
-         db.create_all()  
+        upgrade_database()
+        follow_graph.load_from_db()  # so the first request does not pay for it
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,50 @@
+import os
+import sys
+import tempfile
+
+import pytest
+from flask import g
+
+# Point the app at a throwaway SQLite file before it is imported, so
+# instance/user.db is never touched
+DB_DIR = tempfile.mkdtemp()
+os.environ["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + os.path.join(DB_DIR, "test.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app as flask_app, db, invalidation_bus  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    flask_app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+        # In-process caches and indexes must not outlive the tables
+        for handler in invalidation_bus.reset_handlers:
+            handler()
+
+
+@pytest.fixture
+def make_user(app):
+    from app.models import User
+
+    def make_user(username):
+        user = User(username=username, email=f"{username}@example.com", password_hash="x")
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return make_user
+
+
+@pytest.fixture
+def login(app):
+    def login(client, user):
+        # Requests share the fixture's app context, so drop Flask-Login's cached user too
+        g.pop("_login_user", None)
+        with client.session_transaction() as session:
+            session["_user_id"] = str(user.id)
+            session["_fresh"] = True
+    return login
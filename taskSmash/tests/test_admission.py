@@ -0,0 +1,59 @@
+import threading
+import time
+
+from app import admission
+from app.admission import RouteLimiter
+
+
+def hold_then_release(limiter, seconds):
+    def run():
+        time.sleep(seconds)
+        limiter.release(0.01)
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_waiter_gets_the_slot_freed_within_max_wait():
+    limiter = RouteLimiter("test", max_limit=1, max_queue=1, max_wait=2, target=1)
+    assert limiter.acquire()
+    thread = hold_then_release(limiter, 0.05)
+    start = time.monotonic()
+    assert limiter.acquire()
+    assert time.monotonic() - start < 1
+    thread.join()
+    assert limiter.in_flight == 1 and limiter.waiting == 0
+
+
+def test_waiter_gives_up_at_max_wait():
+    limiter = RouteLimiter("test", max_limit=1, max_queue=1, max_wait=0.05, target=1)
+    assert limiter.acquire()
+    assert not limiter.acquire()
+    assert limiter.rejected == 1 and limiter.waiting == 0
+
+
+def test_full_queue_answers_503_with_retry_after(app, make_user, login, monkeypatch):
+    limiter = RouteLimiter("dashboard", max_limit=1, max_queue=0, max_wait=1, target=1)
+    monkeypatch.setitem(admission.limiters, "dashboard", limiter)
+    client = app.test_client()
+    login(client, make_user("alice"))
+    assert limiter.acquire()
+
+    response = client.get("/dashboard")
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert limiter.rejected == 1
+
+
+def test_streamed_dashboard_holds_its_slot_until_closed(app, make_user, login, monkeypatch):
+    limiter = RouteLimiter("dashboard", max_limit=1, max_queue=0, max_wait=1, target=1)
+    monkeypatch.setitem(admission.limiters, "dashboard", limiter)
+    client = app.test_client()
+    login(client, make_user("alice"))
+
+    response = client.get("/dashboard", buffered=False)
+    assert response.status_code == 200
+    assert limiter.in_flight == 1
+    response.close()
+    assert limiter.in_flight == 0
+    assert client.get("/dashboard").status_code == 200
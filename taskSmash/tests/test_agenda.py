@@ -0,0 +1,44 @@
+import re
+from datetime import datetime, timedelta
+
+from app.models import Todo
+from app.routes import agenda_window
+
+
+def test_due_time_is_stored_in_utc(app, make_user, login):
+    alice = make_user("alice")
+    client = app.test_client()
+    login(client, alice)
+    client.set_cookie("tz_offset", "-120")  # browser two hours ahead of UTC
+
+    client.post("/add", data={"content": "standup", "due_at": "2030-01-01T10:00", "priority": "2"})
+    task = Todo.query.filter_by(content="standup").one()
+    assert task.due_at == datetime(2030, 1, 1, 8, 0)
+    assert "Due 2030-01-01 10:00" in client.get("/dashboard").get_data(as_text=True)
+
+
+def test_agenda_days_start_at_local_midnight():
+    # 23:30 UTC is already 01:30 the next day two hours east of UTC
+    now = datetime(2030, 1, 1, 23, 30)
+    assert agenda_window("today", now, tz_offset=-120) == (now, datetime(2030, 1, 2, 22, 0))
+    assert agenda_window("today", now) == (now, datetime(2030, 1, 2, 0, 0))
+    assert agenda_window("overdue", now, tz_offset=-120) == (None, now)
+
+
+def test_agenda_does_not_nest_task_links_in_its_own(app, make_user, login):
+    from app import db
+    from app.rich_text import rendered_fields
+    alice = make_user("alice")
+    content = "read https://example.com"
+    db.session.add(Todo(content=content, user_id=alice.id, due_at=datetime.utcnow() + timedelta(hours=1),
+                        **rendered_fields(content)))
+    db.session.commit()
+    client = app.test_client()
+    login(client, alice)
+
+    html = client.get("/agenda/week").get_data(as_text=True)
+    assert '<a href="https://example.com"' in html
+    # every anchor in the task's item closes before the next one opens
+    at = html.index("read ")
+    tags = re.findall(r"<a |</a>", html[html.rindex("<li>", 0, at):html.index("</li>", at)])
+    assert tags == ["<a ", "</a>"] * (len(tags) // 2)
@@ -0,0 +1,21 @@
+import pytest
+
+
+@pytest.fixture
+def built(app, tmp_path, monkeypatch):
+    for name, body in (("app.css", b"plain"), ("app.css.br", b"brotli"), ("app.css.gz", b"gzip")):
+        (tmp_path / name).write_bytes(body)
+    monkeypatch.setitem(app.config, "ASSETS_DIR", str(tmp_path))
+    return app.test_client()
+
+
+@pytest.mark.parametrize("accept, encoding, body", [
+    ("gzip, deflate, br", "br", b"brotli"),
+    ("gzip, br;q=0", "gzip", b"gzip"),
+    ("x-brotli-ish, gzip;q=0", None, b"plain"),
+    ("", None, b"plain"),
+])
+def test_serve_picks_encoding_by_quality(built, accept, encoding, body):
+    response = built.get("/assets/app.css", headers={"Accept-Encoding": accept})
+    assert response.headers.get("Content-Encoding") == encoding
+    assert response.get_data() == body
@@ -0,0 +1,48 @@
+from app import db, follow_graph
+from app.models import Follow
+
+
+def test_follow_updates_graph_and_mutual_follows(app, make_user, login):
+    alice, bob = make_user("alice"), make_user("bob")
+    client = app.test_client()
+
+    login(client, alice)
+    client.post(f"/follow/{bob.id}")
+    assert follow_graph.is_following(alice.id, bob.id)
+    assert follow_graph.mutual_follows(alice.id) == []
+
+    login(client, bob)
+    client.post(f"/follow/{alice.id}")
+    assert follow_graph.mutual_follows(alice.id) == [bob.id]
+    assert "Mutual Follows" in client.get("/dashboard").get_data(as_text=True)
+
+    client.post(f"/unfollow/{alice.id}")
+    assert not follow_graph.is_following(bob.id, alice.id)
+    assert follow_graph.mutual_follows(alice.id) == []
+
+
+def test_follow_route_answers_repeat_from_graph(app, make_user, login):
+    alice, bob = make_user("alice"), make_user("bob")
+    client = app.test_client()
+    login(client, alice)
+    client.post(f"/follow/{bob.id}")
+
+    client.post(f"/follow/{bob.id}")
+    with client.session_transaction() as session:
+        assert ("info", "You are already following bob.") in session["_flashes"]
+    assert db.session.query(Follow).count() == 1
+
+
+def test_dashboard_reads_mutual_follows_and_tag_cloud_while_streaming(app, make_user, login, monkeypatch):
+    from app import routes
+    alice = make_user("alice")
+    client = app.test_client()
+    login(client, alice)
+    calls = []
+    monkeypatch.setattr(routes, "tag_cloud", lambda: calls.append("tag_cloud") or [])
+    monkeypatch.setattr(routes.read_models, "users_by_ids", lambda ids: calls.append("mutual_follows") or [])
+
+    response = client.get("/dashboard", buffered=False)
+    assert calls == []
+    response.get_data()
+    assert calls == ["tag_cloud", "mutual_follows"]
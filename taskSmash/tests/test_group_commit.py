@@ -0,0 +1,40 @@
+import threading
+
+import pytest
+
+from app import db
+from app.group_commit import GroupCommitter
+from app.models import User
+
+
+def values(name):
+    return {"username": name, "email": f"{name}@example.com", "password_hash": "x"}
+
+
+def test_insert_commits_directly_when_the_writer_does_not_answer(app, monkeypatch):
+    stuck = threading.Event()
+    committer = GroupCommitter(app, db)
+    committer.timeout = 0.05
+    monkeypatch.setattr(committer, "_run", stuck.wait)
+
+    new_id = committer.insert(User, **values("alice"))
+    stuck.set()
+    assert db.session.get(User, new_id).username == "alice"
+    assert committer._queue.get_nowait()[2].cancelled()
+
+
+def test_pending_rows_fail_when_the_writer_dies(app, monkeypatch):
+    committer = GroupCommitter(app, db)
+    release = threading.Event()
+
+    def write(batch):
+        release.wait()
+        raise SystemExit
+    monkeypatch.setattr(committer, "_write", write)
+
+    first = committer.submit(User, **values("alice"))
+    second = committer.submit(User, **values("bob"))
+    release.set()
+    for future in (first, second):
+        with pytest.raises(RuntimeError, match="writer stopped"):
+            future.result(timeout=1)
@@ -0,0 +1,43 @@
+from app import db, inbox
+from app.models import InboxCounter, InboxItem
+
+
+def unread(user_id):
+    db.session.expire_all()
+    return db.session.get(InboxCounter, user_id).unread
+
+
+def test_mark_read_recounts_and_only_moves_forward(app, make_user):
+    alice, bob = make_user("alice"), make_user("bob")
+    for _ in range(3):
+        inbox.push(alice.id, bob.id, inbox.FOLLOW)
+    db.session.commit()
+    first, second, third = [item.id for item in InboxItem.query.order_by(InboxItem.id)]
+    assert unread(alice.id) == 3
+
+    assert inbox.mark_read(alice.id, second) == 0
+    assert unread(alice.id) == 1
+
+    # An older page must not move the marker back or bump the count
+    assert inbox.mark_read(alice.id, first) == second
+    assert unread(alice.id) == 1
+
+    inbox.push(alice.id, bob.id, inbox.FOLLOW)
+    db.session.commit()
+    assert inbox.mark_read(alice.id, third) == second
+    assert unread(alice.id) == 1
+
+
+def test_inbox_shows_times_in_the_browser_time_zone(app, make_user, login):
+    from datetime import datetime
+    alice, bob = make_user("alice"), make_user("bob")
+    inbox.push(alice.id, bob.id, inbox.FOLLOW)
+    db.session.commit()
+    item = InboxItem.query.one()
+    item.created_at = datetime(2030, 1, 1, 8, 0)
+    db.session.commit()
+    client = app.test_client()
+    login(client, alice)
+    client.set_cookie("tz_offset", "-120")  # browser two hours ahead of UTC
+
+    assert "(2030-01-01 10:00)" in client.get("/inbox").get_data(as_text=True)
@@ -0,0 +1,101 @@
+import pytest
+from flask import Flask
+from sqlalchemy import delete
+
+from config import Config
+from app import db
+from app.fragment_cache import FragmentCache
+from app.invalidation import InvalidationBus, TASK
+from app.models import CacheInvalidation
+
+
+class Worker:
+    """One app instance on the shared database, as one worker process would be."""
+
+    def __init__(self, name):
+        app = Flask(name)
+        app.config.from_object(Config)
+        app.config["INVALIDATION_ENABLED"] = True
+        db.init_app(app)
+        self.app = app
+        self.cache = FragmentCache(100, 60)
+        self.bus = InvalidationBus(app)
+        self.bus.subscribe(TASK, lambda task_id, _: self.cache.delete(task_id))
+        self.bus.on_reset(self.cache.clear)
+        with app.app_context():
+            self.bus.poll(force=True)  # start from the current end of the log
+        for task_id in (1, 2):
+            self.cache.set(task_id, f"<p>thread {task_id}</p>")
+
+    def poll(self):
+        with self.app.app_context():
+            self.bus.poll(force=True)
+
+
+@pytest.fixture
+def workers(app):
+    return Worker("worker_a"), Worker("worker_b")
+
+
+def test_publish_invalidates_both_workers(app, workers):
+    a, b = workers
+    with a.app.app_context():
+        a.bus.publish(TASK, 1)
+
+    assert a.cache.get(1) is None  # local handlers run at once
+    assert b.cache.get(1) is not None  # until the other worker polls
+    b.poll()
+    assert b.cache.get(1) is None
+    assert a.cache.get(2) is not None and b.cache.get(2) is not None
+
+
+def test_id_gap_is_not_a_reset(app, workers):
+    a, b = workers
+    with a.app.app_context():
+        a.bus.publish(TASK, 1)
+    b.poll()
+    # A rolled-back insert (or a sequence) can leave ids unused after the last one b saw
+    db.session.add(CacheInvalidation(id=b.bus.last_id + 50, kind=TASK, subject_id=3))
+    db.session.commit()
+    b.poll()
+
+    assert b.cache.get(2) is not None
+    assert b.cache.get(1) is None
+
+
+def test_trimmed_events_reset_the_worker(app, workers):
+    a, b = workers
+    with a.app.app_context():
+        a.bus.publish(TASK, 1)
+        a.bus.publish(TASK, 3)
+    # The log was trimmed past events b had not seen
+    db.session.execute(delete(CacheInvalidation).where(CacheInvalidation.subject_id == 1))
+    db.session.commit()
+    b.poll()
+
+    assert b.cache.get(2) is None
+
+
+def test_thread_invalidated_while_rendering_is_not_cached(app, make_user, login, monkeypatch):
+    from app import routes, thread_cache
+    from app.models import Todo
+    alice = make_user("alice")
+    task = Todo(content="task", user_id=alice.id)
+    db.session.add(task)
+    db.session.commit()
+    client = app.test_client()
+    login(client, alice)
+
+    task_comments = routes.read_models.task_comments
+
+    def comment_lands_mid_render(task_id):
+        rows = task_comments(task_id)
+        thread_cache.delete(task_id)  # what a comment committed right now would publish
+        return rows
+    monkeypatch.setattr(routes.read_models, "task_comments", comment_lands_mid_render)
+    assert client.get(f"/task/{task.id}/thread").status_code == 200
+    assert thread_cache.get(task.id) is None
+
+    monkeypatch.setattr(routes.read_models, "task_comments", task_comments)
+    client.get(f"/task/{task.id}/thread")
+    assert thread_cache.get(task.id) is not None
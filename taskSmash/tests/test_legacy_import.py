@@ -0,0 +1,38 @@
+import sqlite3
+
+from app import availability_index, follow_graph
+from app.legacy_import import LegacyImporter
+from app.models import User
+
+
+def legacy_db(path):
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE user (id INTEGER PRIMARY KEY, username TEXT, password_hash TEXT);
+        CREATE TABLE follow (follower_id INTEGER, followee_id INTEGER);
+        INSERT INTO user VALUES (1, 'olduser', 'x'), (2, 'otheruser', 'y');
+        INSERT INTO follow VALUES (1, 2), (2, 1);
+    """)
+    conn.commit()
+    conn.close()
+    return str(path)
+
+
+def test_import_reaches_loaded_caches_and_reruns_as_noop(app, make_user, tmp_path):
+    make_user("alice")
+    # Both caches are built before the import, as in a running worker
+    assert availability_index.is_available("username", "olduser")
+    assert follow_graph.mutual_follows(1) == []
+
+    source = legacy_db(tmp_path / "user.db")
+    LegacyImporter(source, log=lambda line: None).run()
+    olduser = User.query.filter_by(username="olduser").one()
+    otheruser = User.query.filter_by(username="otheruser").one()
+    assert not availability_index.is_available("username", "olduser")
+    assert not availability_index.is_available("email", "otheruser@legacy.invalid")
+    assert follow_graph.mutual_follows(olduser.id) == [otheruser.id]
+
+    lines = []
+    LegacyImporter(source, log=lines.append).run()
+    assert [line.split(": ")[1].split(",")[0] for line in lines] == ["0 imported", "0 imported"]
+    assert User.query.count() == 3
@@ -0,0 +1,45 @@
+import os
+import sqlite3
+import threading
+import time
+
+from app import maintenance
+
+
+def make_database(path, rows=5000):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE big (x)")
+    conn.executemany("INSERT INTO big VALUES (?)", [("x" * 500,)] * rows)
+    conn.commit()
+    conn.close()
+
+
+def test_backup_copies_quiet_database(tmp_path):
+    source, dest = str(tmp_path / "source.db"), str(tmp_path / "backup.db")
+    make_database(source)
+
+    stats = maintenance.backup(source, dest, pages=16, sleep=0)
+    assert stats["restarts"] == 0
+    assert sqlite3.connect(dest).execute("SELECT count(*) FROM big").fetchone()[0] == 5000
+
+
+def test_backup_gives_up_after_max_restarts(tmp_path):
+    source, dest = str(tmp_path / "source.db"), str(tmp_path / "backup.db")
+    make_database(source)
+    stop = threading.Event()
+
+    def writer():
+        conn = sqlite3.connect(source, isolation_level=None)
+        while not stop.is_set():
+            conn.execute("INSERT INTO big VALUES ('y')")
+            time.sleep(0.002)
+        conn.close()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        assert maintenance.backup(source, dest, pages=16, sleep=0.005, max_restarts=3) is None
+    finally:
+        stop.set()
+        thread.join()
+    assert not os.path.exists(dest) and not os.path.exists(dest + ".partial")
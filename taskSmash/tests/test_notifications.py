@@ -0,0 +1,94 @@
+import json
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+
+from app import db
+from app.models import Todo, NotificationEvent
+from app.notifications import record_comment_event, send_pending_digests
+
+
+class MailgunStub(BaseHTTPRequestHandler):
+    """Records each POST the way Mailgun would receive it and answers 200."""
+
+    requests = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"])).decode()
+        self.requests.append({"path": self.path, "auth": self.headers.get("Authorization"),
+                              "form": parse_qs(body)})
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(b'{"message": "Queued. Thank you."}')
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def mailgun(app):
+    MailgunStub.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MailgunStub)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    app.config.update(MAILGUN_API_BASE=f"http://127.0.0.1:{server.server_port}/v3",
+                      MAILGUN_DOMAIN="mg.example.com", MAILGUN_API_KEY="key-test",
+                      SENDER_EMAIL="noreply@example.com")
+    yield MailgunStub.requests
+    server.shutdown()
+    server.server_close()
+
+
+def test_digest_batch_post_body(app, mailgun, make_user):
+    alice, bob, carol = make_user("alice"), make_user("bob"), make_user("carol")
+    task = Todo(content="write report", user_id=alice.id)
+    db.session.add(task)
+    db.session.commit()
+
+    # bob comments on alice's task, then carol replies to bob's comment
+    record_comment_event(alice.id, bob.id, task.id, "comment")
+    record_comment_event(alice.id, carol.id, task.id, "reply")
+    record_comment_event(bob.id, carol.id, task.id, "reply")
+
+    window = app.config["NOTIFY_DIGEST_WINDOW_MINUTES"]
+    assert send_pending_digests(now=datetime.utcnow() + timedelta(minutes=window + 1)) == 2
+
+    assert len(mailgun) == 1
+    sent = mailgun[0]
+    assert sent["path"] == "/v3/mg.example.com/messages"
+    assert sent["auth"].startswith("Basic ")
+    form = sent["form"]
+    assert sorted(form["to"]) == ["alice@example.com", "bob@example.com"]
+    assert form["subject"] == ["You have %recipient.count% new comment(s) on TaskSmash"]
+    assert form["text"] == ["Hi %recipient.username%,\n\n%recipient.digest%\n"]
+
+    variables = json.loads(form["recipient-variables"][0])
+    assert set(variables) == {"alice@example.com", "bob@example.com"}
+    assert variables["alice@example.com"] == {
+        "username": "alice",
+        "count": 2,
+        "digest": '- bob commented on your task "write report"\n'
+                  '- carol replied in a thread on your task "write report"',
+    }
+    assert variables["bob@example.com"] == {
+        "username": "bob",
+        "count": 1,
+        "digest": '- carol replied to your comment on the task "write report"',
+    }
+
+    assert NotificationEvent.query.filter(NotificationEvent.sent_at.is_(None)).count() == 0
+
+
+def test_digest_waits_for_window(app, mailgun, make_user):
+    alice, bob = make_user("alice"), make_user("bob")
+    task = Todo(content="write report", user_id=alice.id)
+    db.session.add(task)
+    db.session.commit()
+    record_comment_event(alice.id, bob.id, task.id, "comment")
+
+    assert send_pending_digests() == 0
+    assert mailgun == []
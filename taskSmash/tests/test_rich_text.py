@@ -0,0 +1,39 @@
+from app.rich_text import render
+
+
+def test_emphasis_nests():
+    assert render("**a *b* c**") == "<strong>a <em>b</em> c</strong>"
+    assert render("*a **b** c*") == "<em>a <strong>b</strong> c</em>"
+    assert render("**`x` and @bob**") == '<strong><code>x</code> and <span class="mention">@bob</span></strong>'
+
+
+def test_overlapping_emphasis_is_left_literal():
+    assert render("**a *b** c*") == "**a *b** c*"
+    assert render("*a **b* c**") == "*a **b* c**"
+
+
+def test_snake_case_inside_bold():
+    assert render("**my_var**") == "<strong>my_var</strong>"
+
+
+def test_user_text_cannot_forge_placeholders():
+    assert render("\x000\x00 `x`") == "\x000\x00 <code>x</code>"
+    assert render("0 `x`") == "0 <code>x</code>"
+
+
+def test_url_next_to_link_cannot_swallow_it():
+    html = render("https://x.com[t](https://e.com/x/onmouseover=onerror=alert;throw/**/1//)")
+    assert html == ('<a href="https://x.com" rel="nofollow noopener">https://x.com</a>'
+                    '<a href="https://e.com/x/onmouseover=onerror=alert;throw/**/1//" rel="nofollow noopener">t</a>')
+
+
+def test_url_next_to_code_cannot_swallow_it():
+    assert render("https://x.com`code`") == ('<a href="https://x.com" rel="nofollow noopener">https://x.com</a>'
+                                             '<code>code</code>')
+
+
+def test_link_inside_link_does_not_nest():
+    html = render("[[t](https://a.com)](https://b.com)")
+    assert html == ('<a href="https://a.com" rel="nofollow noopener">[t</a>]('
+                    '<a href="https://b.com" rel="nofollow noopener">https://b.com</a>)')
+    assert render("[`x`](https://b.com)") == '<a href="https://b.com" rel="nofollow noopener"><code>x</code></a>'
@@ -0,0 +1,23 @@
+from sqlalchemy import inspect
+
+from app import db, schema
+
+
+class StaleInspector:
+    """Reports the columns as they were before another worker added them."""
+
+    def __init__(self, bind):
+        self.inspector = inspect(bind)
+
+    def get_columns(self, table):
+        added = {name for name, _ in schema.ADDED_COLUMNS.get(table, [])}
+        return [column for column in self.inspector.get_columns(table) if column["name"] not in added]
+
+
+def test_upgrade_skips_changes_another_worker_made(app, monkeypatch):
+    monkeypatch.setattr(schema, "inspect", StaleInspector)
+    schema.upgrade_database()  # every ALTER hits "duplicate column name"
+    schema.upgrade_database()
+
+    columns = {column["name"] for column in inspect(db.engine).get_columns("todo")}
+    assert {"due_at", "priority"} <= columns
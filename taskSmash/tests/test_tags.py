@@ -0,0 +1,56 @@
+import pytest
+
+from app import db
+from app.models import Tag, Todo
+from app.tags import extract_tags
+
+
+def counts():
+    db.session.expire_all()
+    return {tag.name: tag.task_count for tag in Tag.query.filter(Tag.task_count > 0)}
+
+
+def test_extract_tags():
+    assert extract_tags("Plan #Work and #home, again #work") == ["home", "work"]
+    # Not in words, URL fragments, HTML entities or doubled hashes
+    assert extract_tags("a#b https://x.com/#top &#39; ##x #") == []
+    assert extract_tags(None) == []
+
+
+@pytest.mark.parametrize("soft_delete", [False, True])
+def test_task_counts_follow_add_edit_and_delete(app, make_user, login, monkeypatch, soft_delete):
+    monkeypatch.setitem(app.config, "TASK_SOFT_DELETE", soft_delete)
+    alice = make_user("alice")
+    client = app.test_client()
+    login(client, alice)
+
+    client.post("/add", data={"content": "#work #home"})
+    client.post("/add", data={"content": "more #work"})
+    assert counts() == {"work": 2, "home": 1}
+
+    task = Todo.query.filter_by(content="more #work").one()
+    client.post(f"/edit/{task.id}", data={"content": "now #home #errands", "priority": "2"})
+    assert counts() == {"work": 1, "home": 2, "errands": 1}
+
+    client.post(f"/delete/{task.id}")
+    assert counts() == {"work": 1, "home": 1}
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("tag=work", {"#work #home", "just #work"}),
+    ("tag=work&tag=home", {"#work #home"}),
+    ("tag=work&tag=home&match=any", {"#work #home", "just #work", "just #home"}),
+    ("tag=work&tag=nope", set()),
+    ("tag=%23Home", {"#work #home", "just #home"}),
+])
+def test_dashboard_tag_filter(app, make_user, login, query, expected):
+    alice = make_user("alice")
+    client = app.test_client()
+    login(client, alice)
+    contents = ["#work #home", "just #work", "just #home", "untagged"]
+    for content in contents:
+        client.post("/add", data={"content": content})
+
+    html = client.get(f"/dashboard?{query}").get_data(as_text=True)
+    rendered = [Todo.query.filter_by(content=content).one().content_html for content in contents]
+    assert {content for content, body in zip(contents, rendered) if body in html} == expected
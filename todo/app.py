@@ -1,13 +1,16 @@
 # imports
-from flask import Flask, render_template, redirect, request
+from flask import Flask, render_template, redirect, request, jsonify
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError
 from datetime import datetime
+import os
 
 # toDo App
 app = Flask(__name__)
 
-# create and drop in database
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///todo_db.db"
+# create and drop in database (TODO_DATABASE_URI points somewhere else, e.g. for tests)
+app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("TODO_DATABASE_URI", "sqlite:///todo_db.db")
 db = SQLAlchemy(app)
 
 # create database model
@@ -16,11 +19,65 @@ class ToDo(db.Model):
     content = db.Column(db.String(200), nullable=False)
     complete = db.Column(db.Boolean, default=False)
     created = db.Column(db.DateTime, default=datetime.utcnow)
+    # change sequence number -- bumped on every insert / edit
+    version = db.Column(db.Integer, nullable=False, default=0, index=True)
 
 # return task to database
     def __repr__(self):
         return f"<Task {self.id}>"
 
+# deletion log (tombstones) so sync clients learn about deleted tasks
+class DeletedToDo(db.Model):
+    version = db.Column(db.Integer, primary_key=True)
+    task_id = db.Column(db.Integer, nullable=False)
+    deleted = db.Column(db.DateTime, default=datetime.utcnow)
+
+# single row counter that hands out change sequence numbers
+class SyncCounter(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+# get the next change sequence number inside the current transaction
+# (the counter row is created by setup_database() at startup)
+def next_version():
+    db.session.execute(text("UPDATE sync_counter SET value = value + 1 WHERE id = 1"))
+    return db.session.execute(text("SELECT value FROM sync_counter WHERE id = 1")).scalar()
+
+# add columns that db.create_all() will not add to an existing table
+def upgrade_schema():
+    columns = [c["name"] for c in inspect(db.engine).get_columns("to_do")]
+    if "version" not in columns:
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(text("ALTER TABLE to_do ADD COLUMN version INTEGER NOT NULL DEFAULT 0"))
+        except OperationalError as e:
+            # another worker starting at the same time added it first
+            if "duplicate column" not in str(e.orig).lower():
+                raise
+    with db.engine.begin() as conn:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_to_do_version ON to_do (version)"))
+        # create the counter row once here, so concurrent first writes never race to insert it
+        conn.execute(text("INSERT OR IGNORE INTO sync_counter (id, value) VALUES (1, 0)"))
+        # tasks from before versioning get their own numbers after every version handed out
+        # so far, otherwise /sync?since=0 would never send them
+        current = conn.execute(text("SELECT value FROM sync_counter WHERE id = 1")).scalar()
+        conn.execute(text("UPDATE to_do SET version = id + :current WHERE version = 0"), {"current": current})
+        conn.execute(text(
+            "UPDATE sync_counter SET value = MAX(value,"
+            " (SELECT COALESCE(MAX(version), 0) FROM to_do),"
+            " (SELECT COALESCE(MAX(version), 0) FROM deleted_to_do)) WHERE id = 1"
+        ))
+
+# make the tables, columns and counter row the routes rely on
+def setup_database():
+    with app.app_context():
+        db.create_all()
+        upgrade_schema()
+
+# run on import, so `flask run`, a WSGI server and `python app.py` all start
+# with an up to date database
+setup_database()
+
 # decorator for 'route' to web pages
 # Home page of app -- methods for GET & POST
 @app.route("/", methods=["GET", "POST"])
@@ -29,7 +86,7 @@ def index():
     # add a task 
     if request.method == "POST":
         task_content = request.form["content"]
-        new_task = ToDo(content=task_content)
+        new_task = ToDo(content=task_content, version=next_version())
         try: 
             db.session.add(new_task)
             db.session.commit()
@@ -48,6 +105,7 @@ def index():
 def delete(id:int):
     delete_task = ToDo.query.get_or_404(id)
     try: 
+        db.session.add(DeletedToDo(version=next_version(), task_id=delete_task.id))
         db.session.delete(delete_task)
         db.session.commit()
         return redirect("/")
@@ -61,6 +119,7 @@ def edit(id:int):
     if request.method == "POST":
         task.content = request.form["content"]
         try:
+            task.version = next_version()
             db.session.commit()
             return redirect("/")
         except Exception as e:
@@ -68,10 +127,29 @@ def edit(id:int):
     else:
         return render_template("edit.html", task=task)
 
+# delta sync for offline / mobile clients
+# GET /sync?since=<version> returns only tasks created or edited after that
+# version plus tombstones for tasks deleted after it
+@app.route("/sync")
+def sync():
+    since = request.args.get("since", 0, type=int)
+    # read the counter first so a write that lands mid-request is resent next time, never skipped
+    counter = db.session.get(SyncCounter, 1)
+    current = counter.value if counter else 0
+    changed = ToDo.query.filter(ToDo.version > since).order_by(ToDo.version).all()
+    deleted = DeletedToDo.query.filter(DeletedToDo.version > since).order_by(DeletedToDo.version).all()
+    return jsonify({
+        "version": current,
+        "changed": [{
+            "id": task.id,
+            "content": task.content,
+            "complete": task.complete,
+            "created": task.created.isoformat(),
+            "version": task.version,
+        } for task in changed],
+        "deleted": [{"id": d.task_id, "version": d.version} for d in deleted],
+    })
+
 # run app & turn on debug mode
 if __name__ == "__main__":
-    
-# context manager / context management
-    with app.app_context():
-        db.create_all()
     app.run(debug=True)
\ No newline at end of file
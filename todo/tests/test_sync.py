@@ -0,0 +1,74 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+# Work on a copy of the committed database, which predates the sync columns,
+# so importing the app exercises the same upgrade `flask run` would.
+_tmpdir = tempfile.mkdtemp()
+_db_path = os.path.join(_tmpdir, "todo_db.db")
+shutil.copy(os.path.join(os.path.dirname(__file__), "..", "instance", "todo_db.db"), _db_path)
+os.environ["TODO_DATABASE_URI"] = f"sqlite:///{_db_path}"
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app import app  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    app.config["TESTING"] = True
+    return app.test_client()
+
+
+def sync(client, since=0):
+    response = client.get(f"/sync?since={since}")
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def add(client, content):
+    client.post("/", data={"content": content})
+    return next(task["id"] for task in reversed(sync(client)["changed"]) if task["content"] == content)
+
+
+def test_pages_work_on_an_upgraded_database(client):
+    assert client.get("/").status_code == 200
+    assert sync(client)["version"] >= 0
+
+
+def test_changes_come_back_in_version_order(client):
+    start = sync(client)["version"]
+    first = add(client, "first")
+    second = add(client, "second")
+    client.post(f"/edit/{first}", data={"content": "first, edited"})
+
+    changes = sync(client, start)
+    assert [task["id"] for task in changes["changed"]] == [second, first]
+    versions = [task["version"] for task in changes["changed"]]
+    assert versions == sorted(versions)
+    assert changes["version"] == versions[-1]
+
+
+def test_deleted_tasks_come_back_as_tombstones(client):
+    task_id = add(client, "short lived")
+    start = sync(client)["version"]
+    client.get(f"/delete/{task_id}")
+
+    changes = sync(client, start)
+    assert changes["changed"] == []
+    assert changes["deleted"] == [{"id": task_id, "version": start + 1}]
+    assert changes["version"] == start + 1
+
+
+def test_since_cursor_only_returns_newer_changes(client):
+    add(client, "already synced")
+    cursor = sync(client)["version"]
+    assert sync(client, cursor)["changed"] == []
+    assert sync(client, cursor)["deleted"] == []
+
+    newer = add(client, "after the cursor")
+    changes = sync(client, cursor)
+    assert [task["id"] for task in changes["changed"]] == [newer]
+    assert sync(client, changes["version"])["changed"] == []